@@ -0,0 +1,31 @@
+# atomicfile.py — écriture atomique commune aux caches, digests, métriques et artefacts :
+# fichier temporaire unique (mkstemp) dans le dossier de la cible, puis os.replace.
+# Deux threads ou process qui écrivent la même cible ne partagent jamais le même tmp.
+
+import os
+import tempfile
+from typing import Optional, Union
+
+
+def write_atomic(path: str, data: Union[str, bytes], mode: int = 0o644, dir_mode: Optional[int] = None):
+    """
+    Remplace path par data (texte UTF-8 ou octets) d'un seul coup ; crée le dossier au besoin
+    (avec dir_mode si donné). Le fichier final a les permissions `mode`.
+    """
+    target_dir = os.path.dirname(os.path.abspath(path))
+    if dir_mode is not None:
+        os.makedirs(target_dir, mode=dir_mode, exist_ok=True)
+    else:
+        os.makedirs(target_dir, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    # mkstemp crée le tmp en 0600 : rien n'est lisible avant le chmod final
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=target_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
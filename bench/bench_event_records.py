@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# bench_event_records.py — mémoire des événements gardés en RAM : dicts avec l'intitulé brut
+# (ancien normalize_event) vs ics_stream.Event (__slots__ + champs internés).
+# Usage: python bench/bench_event_records.py [nb_events ...]
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ics_stream import Event, normalize_event, to_ics_date
+
+COURSES = ["PROD", "MADEC", "ACTOR", "IAMAR", "OPTIM", "ROBOT", "SIGNA", "LANG1"]
+ROOMS = ["C008", "C205", "C210", "C026 (salle informatique)", "L_R+1_01", "T101", "E203"]
+TEACHERS = ["ESLAMI", "CHENOUARD", "WEBSTER", "MARTIN", "DURAND", "LEROUX"]
+TYPES = ["CM", "TD", "TP", "DS"]
+
+
+def make_raw_events(n: int) -> list:
+    rnd = random.Random(n)
+    return [
+        {
+            "id": str(26000000 + i),
+            # chaînes construites une à une, comme après json.loads d'une réponse
+            "title": " - ".join((rnd.choice(COURSES), rnd.choice(ROOMS), rnd.choice(TEACHERS),
+                                 rnd.choice(TYPES))) + " -",
+            "start": f"2025-{9 + i % 4:02d}-{1 + i % 28:02d}T08:00:00+0200",
+            "end": f"2025-{9 + i % 4:02d}-{1 + i % 28:02d}T10:00:00+0200",
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_normalize(ev: dict) -> dict:
+    return {
+        "uid": ev["id"] + "@onboard.ec-nantes.fr",
+        "start": to_ics_date(ev["start"]),
+        "end": to_ics_date(ev["end"]),
+        "summary": ev["title"].strip(),
+    }
+
+
+def deep_size(records: list) -> int:
+    """Taille des enregistrements et de leurs chaînes, chaque objet partagé compté une fois."""
+    seen = set()
+    total = sys.getsizeof(records)
+
+    def add(obj):
+        nonlocal total
+        if obj is not None and id(obj) not in seen:
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+
+    for rec in records:
+        add(rec)
+        if isinstance(rec, dict):
+            for k, v in rec.items():
+                add(k)
+                add(v)
+        else:
+            for slot in Event.__slots__:
+                add(getattr(rec, slot))
+    return total
+
+
+def measure(fn, raw: list) -> int:
+    return deep_size([fn(ev) for ev in raw])
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [1000, 10000, 100000]
+    print(f"{'events':>8} {'dicts (Ko)':>12} {'Event (Ko)':>12} {'gain':>7}")
+    for n in sizes:
+        raw = make_raw_events(n)
+        old = measure(legacy_normalize, raw)
+        new = measure(normalize_event, raw)
+        print(f"{n:>8} {old // 1024:>12} {new // 1024:>12} {old / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# bench_jsf_parser.py — micro-benchmark : ancienne analyse multi-passes de requete_post
+# vs jsf_parser.parse_jsf_response, sur des réponses Planning synthétiques.
+# Usage: python bench/bench_jsf_parser.py [nb_events ...]
+
+import os
+import re
+import sys
+import json
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+
+from jsf_parser import parse_jsf_response
+
+
+def make_planning_partial(n_events: int, schedule_id: str = "form:j_idt118") -> str:
+    """Partial-response comparable à celle renvoyée par Planning.xhtml pour n_events cours."""
+    events = [
+        {
+            "id": str(26000000 + i),
+            "title": f"PROD - C{i % 300:03d} - ESLAMI - TD -",
+            "start": "2025-09-08T10:15:00+0200",
+            "end": "2025-09-08T12:15:00+0200",
+            "allDay": False,
+            "className": "cours",
+        }
+        for i in range(n_events)
+    ]
+    hidden = "".join(
+        f'<input type="hidden" name="form:hidden{i}" value="v{i}" />' for i in range(50)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<partial-response id="j_id1"><changes>'
+        f'<update id="{schedule_id}"><![CDATA[{json.dumps([{"events": events}])}]]></update>'
+        f'<update id="form:panel"><![CDATA[<div>{hidden}</div>'
+        f'<script>PrimeFaces.cw("Schedule","widget",{{id:"{schedule_id}"}});</script>]]></update>'
+        '<update id="j_id1:javax.faces.ViewState:0"><![CDATA[-123456789:987654321]]></update>'
+        '</changes></partial-response>'
+    )
+
+
+def legacy_parse(text: str):
+    """Copie de l'analyse historique de requete_post (ET + BeautifulSoup par <update> + ET)."""
+    schedule_id = None
+    collected_hidden = {}
+    root = ET.fromstring(text)
+    for upd in root.findall(".//update"):
+        upd_id = upd.get("id") or ""
+        upd_text = upd.text or ""
+        m = re.search(r'id\s*:\s*"([^"]+)"', upd_text)
+        if m and re.match(r'form:j_idt\d+', m.group(1)):
+            schedule_id = m.group(1)
+        if not schedule_id:
+            m2 = re.search(r'(form:j_idt\d+)', upd_id)
+            if m2:
+                schedule_id = m2.group(1)
+        for inp in BeautifulSoup(upd_text, "html.parser").find_all("input", {"type": "hidden"}):
+            name = inp.get("name") or inp.get("id")
+            if name:
+                collected_hidden[name] = inp.get("value", "")
+    new_vs = None
+    for upd in ET.fromstring(text).findall('.//update'):
+        if 'ViewState' in (upd.get('id') or ''):
+            new_vs = (upd.text or '').strip()
+    return schedule_id, collected_hidden, new_vs
+
+
+def timeit(fn, arg, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [100, 1000, 5000]
+    print(f"{'events':>8} {'taille':>10} {'legacy (ms)':>12} {'single-pass (ms)':>17} {'speedup':>8}")
+    for n in sizes:
+        text = make_planning_partial(n)
+        parsed = parse_jsf_response(text)
+        assert (parsed.schedule_id, parsed.hidden, parsed.viewstate) == legacy_parse(text)
+        t_old = timeit(legacy_parse, text)
+        t_new = timeit(parse_jsf_response, text)
+        print(f"{n:>8} {len(text):>10} {t_old * 1000:>12.2f} {t_new * 1000:>17.2f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# bench_startup.py — budget de démarrage à froid de get_ics.py.
+# 1) `python -X importtime -c "import get_ics"` répété : médiane du temps cumulé d'import ;
+# 2) vérifie que ni l'import ni un run complet (contre le mock local) ne chargent bs4 / icalendar.
+# Usage: python bench/bench_startup.py [--budget-ms 100] [--repeat 7]
+
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+
+# modules lourds que le flow normal ne doit plus charger
+HEAVY = ("bs4", "icalendar", "lxml")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+# run complet dans un process neuf : login -> planning -> ICS, puis liste des modules lourds chargés
+FLOW_SCRIPT = """
+import os, sys, tempfile
+sys.path.insert(0, {bench!r})
+import mock_onboard
+server, state, base = mock_onboard.start_server(0)
+os.environ["ONBOARD_BASE"] = base
+os.environ["ONBOARD_RATE"] = "0"
+sys.path.insert(0, {root!r})
+import get_ics
+with tempfile.TemporaryDirectory() as d:
+    client = get_ics.OnboardClient("bench", "bench", output=os.path.join(d, "planning.ics"))
+    client.run()
+server.shutdown()
+print("HEAVY", " ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def import_profile(module: str = "get_ics"):
+    """
+    Renvoie (temps cumulé du module en µs, {sous-module: cumulé µs}) pour un import à froid.
+    Seuls les imports déclenchés par `module` sont gardés (pas ceux du démarrage de Python).
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    rows = [(len(m.group(3)), m.group(4), int(m.group(2)))
+            for m in map(_IMPORTTIME_RE.match, out.splitlines()) if m]
+    # importtime écrit les enfants avant le parent, plus indentés que lui
+    idx = max(i for i, (_, name, _) in enumerate(rows) if name == module)
+    depth, total = rows[idx][0], rows[idx][2]
+    modules = {}
+    for indent, name, cumulative in reversed(rows[:idx]):
+        if indent <= depth:
+            break
+        modules[name] = cumulative
+    return total, modules
+
+
+def flow_heavy_modules() -> list:
+    code = FLOW_SCRIPT.format(bench=HERE, root=ROOT, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    for line in out.splitlines():
+        if line.startswith("HEAVY"):
+            return line.split()[1:]
+    raise RuntimeError("le run complet n'a pas abouti")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Budget de temps d'import de get_ics.py")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="temps d'import cumulé toléré (médiane)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--top", type=int, default=8, help="modules les plus coûteux à afficher")
+    args = parser.parse_args(argv)
+
+    samples, modules = [], {}
+    for _ in range(args.repeat):
+        total, modules = import_profile()
+        samples.append(total)
+    median_ms = statistics.median(samples) / 1000
+    print(f"import get_ics : médiane {median_ms:.1f} ms sur {args.repeat} runs (budget {args.budget_ms:.0f} ms)")
+    for name, us in sorted(modules.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<32} {us / 1000:>7.1f} ms")
+
+    problems = []
+    if median_ms > args.budget_ms:
+        problems.append(f"temps d'import {median_ms:.1f} ms > budget {args.budget_ms:.0f} ms")
+    loaded = [m for m in HEAVY if m in modules]
+    if loaded:
+        problems.append("modules lourds chargés à l'import : " + ", ".join(loaded))
+    loaded = flow_heavy_modules()
+    if loaded:
+        problems.append("modules lourds chargés pendant le run : " + ", ".join(loaded))
+    else:
+        print(f"run complet sans {', '.join(HEAVY)} : ok")
+
+    for p in problems:
+        print("Régression : " + p)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# mock_onboard.py — faux serveur OnBoard local (Login → MainMenuPage → Planning.xhtml) pour
+# mesurer get_ics.py sans réseau. Émet des ViewState, peut renuméroter les j_idt et
+# renvoie des partial-responses avec un nombre d'événements et une latence réglables.
+# Peut compresser en gzip (Accept-Encoding) et injecter des 502 transitoires.
+# Usage: python bench/mock_onboard.py [--port 8765] [--events-per-week 25] [--latency 0.05] [--id-offset 0]
+#                                     [--no-gzip] [--fail-every N] [--require-nav]
+#        puis ONBOARD_BASE=http://127.0.0.1:8765 ONBOARD_PASS=x python get_ics.py
+
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+COURSES = ["PROD", "MADEC", "ACTOR", "IAMAR", "OPTIM", "ROBOT", "SIGNA", "LANG1"]
+ROOMS = ["C008", "C205", "C210", "C026 (salle informatique)", "L_R+1_01", "T101", "E203"]
+TEACHERS = ["ESLAMI", "CHENOUARD", "WEBSTER", "MARTIN", "DURAND", "LEROUX"]
+TYPES = ["CM", "TD", "TP", "DS"]
+SLOTS = [(8, 0), (10, 15), (13, 45), (16, 0)]
+PARIS = timezone(timedelta(hours=2))   # décalage fixe : suffisant pour un jeu de données synthétique
+
+LOGIN_HTML = """<!DOCTYPE html><html><head><title>OnBoard</title></head><body>
+<form id="formulaireSpring" name="formulaireSpring" method="post" action="/faces/Login.xhtml">
+<input type="text" name="username" /><input type="password" name="password" />
+<button id="{login_btn}" name="{login_btn}" type="submit">Connexion</button>
+<input type="hidden" name="javax.faces.ViewState" id="j_id1:javax.faces.ViewState:0" value="{vs}" />
+</form></body></html>"""
+
+MAINMENU_HTML = """<!DOCTYPE html><html><head><title>MainMenuPage</title></head><body>
+<form id="form" name="form" method="post" action="/faces/MainMenuPage.xhtml">
+<a id="{submenu}" href="#" onclick="PrimeFaces.ab({{s:&quot;{submenu}&quot;}});return false;">Scolarité</a>
+<script>PrimeFaces.ab({{s:"{submenu}",f:"form",u:"form:sidebar"}});</script>
+<div id="form:sidebar"><a href="#">Planning</a> Déconnexion Mon compte</div>
+<input type="hidden" name="form:largeurDivCenter" value="907" />
+<input type="hidden" name="form:idInit" value="webscolaapp.MainMenuPage_5977318950196537139" />
+<input id="{menu_select}_focus" name="{menu_select}_focus" />
+<input id="{menu_select}_input" name="{menu_select}_input" value="45803" />
+<input type="hidden" id="{reflow_grid}:{reflow_col}_reflowDD" name="{reflow_grid}:{reflow_col}_reflowDD" value="0_0" />
+<input type="hidden" name="javax.faces.ViewState" id="j_id1:javax.faces.ViewState:0" value="{vs}" />
+</form>{padding}</body></html>"""
+
+PLANNING_HTML = """<!DOCTYPE html><html><head><title>Planning</title></head><body>
+<form id="form" name="form" method="post" action="/faces/Planning.xhtml">
+<input type="hidden" name="form:largeurDivCenter" value="1550" />
+<input type="hidden" name="form:idInit" value="webscolaapp.Planning_-1425867247129692267" />
+<input id="form:date_input" name="form:date_input" value="15/09/2025" />
+<input type="hidden" id="form:week" name="form:week" value="38-2025" />
+<div id="{schedule}"></div>
+<script>PrimeFaces.cw("Schedule","widget_form_schedule",{{id:"{schedule}",widgetVar:"widget_form_schedule"}});</script>
+<input type="hidden" name="javax.faces.ViewState" id="j_id1:javax.faces.ViewState:0" value="{vs}" />
+</form>{padding}</body></html>"""
+
+PARTIAL = ('<?xml version="1.0" encoding="UTF-8"?>\n<partial-response id="j_id1"><changes>{updates}'
+           '<update id="j_id1:javax.faces.ViewState:0"><![CDATA[{vs}]]></update></changes></partial-response>')
+
+
+class MockState:
+    """Réglages et sessions du faux serveur (partagés entre threads)."""
+
+    def __init__(self, events_per_week=25, latency=0.0, id_offset=0, page_padding=0, password=None,
+                 gzip_min=1024, fail_every=0, require_nav=False):
+        self.events_per_week = events_per_week
+        self.gzip_min = gzip_min          # compresse les corps >= gzip_min octets (-1 : jamais)
+        self.fail_every = fail_every      # 1 requête sur N répond 502 (0 : jamais)
+        self.require_nav = require_nav    # GET Planning direct refusé tant que le menu n'a pas été traversé
+        self.latency = latency
+        self.id_offset = id_offset
+        self.page_padding = page_padding
+        self.password = password
+        self.sessions = {}        # JSESSIONID -> {"logged": bool, "viewstates": set}
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def jid(self, n: int, prefix: str = "form:") -> str:
+        return f"{prefix}j_idt{n + self.id_offset}"
+
+    @property
+    def ids(self) -> dict:
+        return {
+            "login_btn": self.jid(27, ""),
+            "submenu": self.jid(52),
+            "menu_select": self.jid(815),
+            "reflow_grid": self.jid(856),
+            "reflow_col": self.jid(858, ""),
+            "schedule": self.jid(118),
+        }
+
+    def events_between(self, start_ms: int, end_ms: int) -> list:
+        """Événements déterministes (même id pour le même créneau) dans [start, end[."""
+        out = []
+        day = datetime.fromtimestamp(start_ms / 1000, PARIS).replace(hour=0, minute=0, second=0, microsecond=0)
+        end = datetime.fromtimestamp(end_ms / 1000, PARIS)
+        per_day = max(1, round(self.events_per_week / 5))
+        while day < end:
+            if day.weekday() < 5:
+                for k in range(per_day):
+                    h, m = SLOTS[k % len(SLOTS)]
+                    start = day.replace(hour=h, minute=m) + timedelta(days=0, minutes=15 * (k // len(SLOTS)))
+                    seed = int(start.timestamp()) // 60 + k
+                    rnd = random.Random(seed)
+                    title = f"{rnd.choice(COURSES)} - {rnd.choice(ROOMS)} - {rnd.choice(TEACHERS)} - {rnd.choice(TYPES)} -"
+                    out.append({
+                        "id": str(26000000 + seed % 10_000_000),
+                        "title": title,
+                        "start": start.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                        "end": (start + timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%S%z"),
+                        "allDay": False,
+                        "editable": False,
+                        "className": "cours",
+                    })
+            day += timedelta(days=1)
+        return out
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "MockOnBoard/1.0"
+    state: MockState = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    # ---------- helpers ----------
+    def session(self, create=False):
+        cookie = self.headers.get("Cookie", "")
+        sid = None
+        for part in cookie.split(";"):
+            k, _, v = part.strip().partition("=")
+            if k == "JSESSIONID":
+                sid = v
+        st = self.state
+        with st.lock:
+            if sid in st.sessions:
+                return sid, st.sessions[sid], False
+            if not create:
+                return None, None, False
+            sid = f"{random.getrandbits(64):016x}"
+            st.sessions[sid] = {"logged": False, "viewstates": set()}
+            return sid, st.sessions[sid], True
+
+    def new_viewstate(self, sess) -> str:
+        vs = f"{random.getrandbits(31)}:{random.getrandbits(31)}"
+        with self.state.lock:
+            sess["viewstates"].add(vs)
+        return vs
+
+    def send(self, status, body: str, ctype="text/html;charset=UTF-8", sid=None, location=None):
+        data = body.encode("utf-8")
+        gzipped = (0 <= self.state.gzip_min <= len(data)
+                   and "gzip" in self.headers.get("Accept-Encoding", ""))
+        if gzipped:
+            data = gzip.compress(data, compresslevel=6)
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if sid:
+            self.send_header("Set-Cookie", f"JSESSIONID={sid}; Path=/; HttpOnly")
+        if location:
+            self.send_header("Location", location)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def pause(self) -> bool:
+        """Compte la requête et applique la latence ; False si elle doit échouer (502 injecté)."""
+        with self.state.lock:
+            self.state.requests += 1
+            n = self.state.requests
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        return not (self.state.fail_every and n % self.state.fail_every == 0)
+
+    def padding(self) -> str:
+        return "<!--" + "x" * self.state.page_padding + "-->" if self.state.page_padding else ""
+
+    # ---------- GET ----------
+    def do_GET(self):
+        if not self.pause():
+            return self.send(502, "Bad Gateway")
+        path = urlparse(self.path).path
+        st = self.state
+        if path == "/faces/Login.xhtml":
+            sid, sess, created = self.session(create=True)
+            return self.send(200, LOGIN_HTML.format(vs=self.new_viewstate(sess), **st.ids), sid=sid if created else None)
+        sid, sess, _ = self.session()
+        if not sess or not sess["logged"]:
+            return self.send(302, "", location="/faces/Login.xhtml")
+        if path in ("/", "/faces/MainMenuPage.xhtml"):
+            return self.send(200, MAINMENU_HTML.format(vs=self.new_viewstate(sess), padding=self.padding(), **st.ids))
+        if path == "/faces/Planning.xhtml":
+            if st.require_nav and not sess.get("nav"):
+                return self.send(200, MAINMENU_HTML.format(vs=self.new_viewstate(sess), padding=self.padding(), **st.ids))
+            return self.send(200, PLANNING_HTML.format(vs=self.new_viewstate(sess), padding=self.padding(), **st.ids))
+        self.send(404, "not found")
+
+    # ---------- POST ----------
+    def do_POST(self):
+        ok = self.pause()
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True).items()}
+        if not ok:
+            return self.send(502, "Bad Gateway")
+        st = self.state
+        ids = st.ids
+        sid, sess, _ = self.session()
+        if not sess:
+            return self.send(302, "", location="/faces/Login.xhtml")
+        if form.get("javax.faces.ViewState") not in sess["viewstates"]:
+            return self.send(500, "javax.faces.application.ViewExpiredException")
+
+        if path == "/faces/Login.xhtml":
+            if ids["login_btn"] not in form or (st.password and form.get("password") != st.password):
+                return self.send(200, LOGIN_HTML.format(vs=self.new_viewstate(sess), **ids))
+            sess["logged"] = True
+            return self.send(200, MAINMENU_HTML.format(vs=self.new_viewstate(sess), padding=self.padding(), **ids))
+        if not sess["logged"]:
+            return self.send(302, "", location="/faces/Login.xhtml")
+
+        partial = form.get("javax.faces.partial.ajax") == "true"
+        source = form.get("javax.faces.source")
+        if path == "/faces/MainMenuPage.xhtml":
+            if partial:
+                if source != ids["submenu"]:
+                    return self.send(500, f"unknown component {source}")
+                upd = '<update id="form:sidebar"><![CDATA[<div id="form:sidebar"><a>Planning</a></div>]]></update>'
+                return self.send(200, PARTIAL.format(updates=upd, vs=self.new_viewstate(sess)), ctype="text/xml;charset=UTF-8")
+            if form.get("form:sidebar_menuid"):
+                sess["nav"] = True
+                return self.send(200, PLANNING_HTML.format(vs=self.new_viewstate(sess), padding=self.padding(), **ids))
+            return self.send(200, MAINMENU_HTML.format(vs=self.new_viewstate(sess), padding=self.padding(), **ids))
+
+        if path == "/faces/Planning.xhtml":
+            sched = ids["schedule"]
+            if source != sched or f"{sched}_start" not in form:
+                return self.send(500, f"unknown component {source}")
+            events = st.events_between(int(form[f"{sched}_start"]), int(form[f"{sched}_end"]))
+            upd = f'<update id="{sched}"><![CDATA[{{"events" : {json.dumps(events, ensure_ascii=False)}}}]]></update>'
+            return self.send(200, PARTIAL.format(updates=upd, vs=self.new_viewstate(sess)), ctype="text/xml;charset=UTF-8")
+        self.send(404, "not found")
+
+
+def start_server(port: int = 0, **settings):
+    """Démarre le faux serveur dans un thread ; renvoie (serveur, état, URL de base)."""
+    state = MockState(**settings)
+    handler = type("BoundHandler", (Handler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Faux serveur OnBoard JSF pour tests hors ligne")
+    parser.add_argument("--port", type=int, default=8765, help="0 = port libre choisi par le système")
+    parser.add_argument("--events-per-week", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.0, help="latence ajoutée à chaque requête (s)")
+    parser.add_argument("--id-offset", type=int, default=0, help="décale tous les j_idt (renumérotation)")
+    parser.add_argument("--page-padding", type=int, default=0, help="octets de remplissage des pages HTML")
+    parser.add_argument("--no-gzip", action="store_true", help="ne compresse jamais les réponses")
+    parser.add_argument("--fail-every", type=int, default=0, help="une requête sur N répond 502")
+    parser.add_argument("--require-nav", action="store_true",
+                        help="Planning.xhtml n'est servi qu'après la navigation par le menu")
+    args = parser.parse_args(argv)
+    server, _, base = start_server(args.port, events_per_week=args.events_per_week, latency=args.latency,
+                                   id_offset=args.id_offset, page_padding=args.page_padding,
+                                   gzip_min=-1 if args.no_gzip else 1024, fail_every=args.fail_every,
+                                   require_nav=args.require_nav)
+    print(f"mock OnBoard sur {base} (Ctrl-C pour arrêter)", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# run_bench.py — benchmark hors ligne de get_ics.py contre bench/mock_onboard.py.
+# Mesure par phase (login, main_menu, planning, download) : temps mur, nombre de requêtes,
+# octets échangés (sur le fil, avant décompression), temps d'analyse et pic mémoire ; écrit un
+# JSON comparable. La phase planning suit le chemin de main() : GET Planning direct, détour par
+# le sous-menu seulement si le serveur l'exige (--require-nav pour mesurer ce détour).
+# Usage: python bench/run_bench.py [--events-per-week 25] [--latency 0.02] [--range 01/09/2025 30/06/2026]
+#                                  [--require-nav] [--out bench_results.json] [--compare ancien.json]
+
+import os
+import re
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from transport import wire_bytes
+
+PHASES = ("login", "main_menu", "planning", "download")
+# métriques où une hausse est une régression (toutes ici)
+METRICS = ("wall_s", "requests", "bytes_sent", "bytes_received", "parse_s", "peak_mem_kb")
+
+
+class Probe:
+    """Compteurs de la phase en cours, alimentés par les hooks posés sur le client."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.bytes_sent = 0
+        self.responses = []
+        self.parse_s = 0.0
+
+    def on_response(self, r, *args, **kwargs):
+        self.requests += 1
+        body = r.request.body or b""
+        self.bytes_sent += len(body if isinstance(body, bytes) else body.encode("utf-8"))
+        # le hook passe avant la lecture du corps : les octets reçus sont comptés en fin de phase
+        self.responses.append(r)
+
+    @property
+    def bytes_received(self) -> int:
+        """Octets reçus sur le fil (compressés) ; taille décodée si urllib3 ne la connaît pas."""
+        total = 0
+        for r in self.responses:
+            n = wire_bytes(r)
+            total += n if n is not None else len(r.content)
+        return total
+
+
+def timed(probe, fn):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            probe.parse_s += time.perf_counter() - t0
+    return wrapper
+
+
+def timed_gen(probe, fn):
+    def wrapper(*args, **kwargs):
+        it = fn(*args, **kwargs)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                probe.parse_s += time.perf_counter() - t0
+                return
+            probe.parse_s += time.perf_counter() - t0
+            yield item
+    return wrapper
+
+
+ORIGINALS = {}
+
+
+def start_mock(args):
+    """Lance le mock dans un process séparé : ses allocations et son CPU ne faussent pas les mesures."""
+    cmd = [sys.executable, os.path.join(HERE, "mock_onboard.py"), "--port", "0",
+           "--events-per-week", str(args.events_per_week), "--latency", str(args.latency),
+           "--id-offset", str(args.id_offset), "--page-padding", str(args.page_padding)]
+    if args.require_nav:
+        cmd.append("--require-nav")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    m = re.search(r'(http://[\d.]+:\d+)', proc.stdout.readline())
+    if not m:
+        proc.kill()
+        raise RuntimeError("le mock OnBoard n'a pas démarré")
+    return proc, m.group(1)
+
+
+def run_once(get_ics, args, out_dir, measure_memory=False):
+    probe = Probe()
+    # instrumentation du temps d'analyse : parse JSF, découverte des ids, extraction des événements
+    # (les fonctions d'origine sont gardées pour ne pas empiler les wrappers d'un run à l'autre)
+    originals = ORIGINALS.setdefault("get_ics", {
+        name: getattr(get_ics, name) for name in ("parse_jsf_response", "iter_events", "iter_raw_events")
+    })
+    get_ics.parse_jsf_response = timed(probe, originals["parse_jsf_response"])
+    get_ics.iter_events = timed_gen(probe, originals["iter_events"])
+    get_ics.iter_raw_events = timed_gen(probe, originals["iter_raw_events"])
+
+    client = get_ics.OnboardClient("bench", "bench", output=os.path.join(out_dir, "planning.ics"),
+                                   limiter=get_ics.TokenBucket(args.rate, get_ics.RATE_BURST))
+    client.ids.learn = timed(probe, client.ids.learn)
+    client.session.hooks["response"].append(probe.on_response)
+
+    steps = {
+        "login": client.login,
+        "main_menu": client.open_main_menu,
+        # même chemin que main() (état menu) : GET direct, détour seulement si refusé
+        "planning": client.reach_planning,
+    }
+    if args.range:
+        start, end = get_ics.parse_date(args.range[0]), get_ics.parse_date(args.range[1])
+        steps["download"] = lambda: client.dl_range(start, end, args.window)
+    else:
+        steps["download"] = lambda: client.dl_ics("15/09/2025", "38-2025")
+
+    results = {}
+    for phase in PHASES:
+        probe.reset()
+        if measure_memory:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        steps[phase]()
+        wall = time.perf_counter() - t0
+        peak = 0
+        if measure_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        results[phase] = {
+            "wall_s": wall,
+            "requests": probe.requests,
+            "bytes_sent": probe.bytes_sent,
+            "bytes_received": probe.bytes_received,
+            "parse_s": probe.parse_s,
+            "peak_mem_kb": peak // 1024,
+        }
+    return results
+
+
+def median_runs(runs, memory_run):
+    """Médiane des runs chronométrés ; le pic mémoire vient du run passé sous tracemalloc."""
+    out = {}
+    for phase in PHASES:
+        out[phase] = {}
+        for m in METRICS:
+            if m == "peak_mem_kb":
+                out[phase][m] = memory_run[phase][m]
+                continue
+            med = statistics.median_low([r[phase][m] for r in runs])
+            out[phase][m] = round(med, 6) if isinstance(med, float) else med
+    out["total"] = {
+        m: round(sum(out[p][m] for p in PHASES), 6) if m != "peak_mem_kb" else max(out[p][m] for p in PHASES)
+        for m in METRICS
+    }
+    return out
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(result, baseline=None, threshold=0.10):
+    """Affiche les métriques ; avec baseline, ajoute l'écart et renvoie les régressions."""
+    regressions = []
+    header = f"{'phase':<10}" + "".join(f"{m:>16}" for m in METRICS)
+    print(header)
+    for phase in PHASES + ("total",):
+        row = f"{phase:<10}"
+        for m in METRICS:
+            v = result[phase][m]
+            cell = f"{v:.4f}" if isinstance(v, float) else str(v)
+            if baseline and phase in baseline.get("phases", {}):
+                old = baseline["phases"][phase][m]
+                if old:
+                    delta = (v - old) / old
+                    cell += f" {delta:+.0%}"
+                    # les temps très courts sont trop bruités pour être comparés
+                    if delta > threshold and not (m.endswith("_s") and v < 0.005):
+                        regressions.append(f"{phase}.{m}: {old} -> {v} ({delta:+.0%})")
+            row += f"{cell:>16}"
+        print(row)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne de get_ics.py (mock OnBoard local)")
+    parser.add_argument("--events-per-week", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.0, help="latence simulée par requête (s)")
+    parser.add_argument("--id-offset", type=int, default=0, help="renumérotation des j_idt côté serveur")
+    parser.add_argument("--page-padding", type=int, default=20000, help="octets de remplissage des pages HTML")
+    parser.add_argument("--range", nargs=2, metavar=("DEBUT", "FIN"), help="mesure le mode plage")
+    parser.add_argument("--window", choices=("week", "month"), default="week")
+    parser.add_argument("--require-nav", action="store_true",
+                        help="le mock n'accepte le GET Planning qu'après le sous-menu (mesure le détour)")
+    parser.add_argument("--rate", type=float, default=0.0, help="débit du limiteur (0 = désactivé)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="fichier JSON de résultats")
+    parser.add_argument("--compare", help="JSON d'un run précédent à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="hausse tolérée avant de signaler une régression")
+    args = parser.parse_args(argv)
+
+    proc, base = start_mock(args)
+    os.environ["ONBOARD_BASE"] = base
+    import get_ics
+
+    # tracemalloc ralentit fortement le code : un run dédié pour la mémoire, les autres pour les temps
+    runs = []
+    try:
+        for i in range(args.repeat + 1):
+            with tempfile.TemporaryDirectory() as out_dir, open(os.devnull, "w") as devnull, \
+                    contextlib.redirect_stdout(devnull):
+                runs.append(run_once(get_ics, args, out_dir, measure_memory=(i == 0)))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    result = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_rev(),
+            "python": platform.python_version(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "phases": median_runs(runs[1:], runs[0]),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = print_table(result["phases"], baseline, args.threshold)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"résultats écrits dans {args.out}")
+    if regressions:
+        print("Régressions :")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# captures.py — captures de réponses HTTP pour le debug : compressées en gzip, écrites par un
+# thread dédié (jamais sur le chemin des requêtes), dans un dossier à part, en anneau borné
+# (nombre et taille totale, les plus anciennes supprimées d'abord). Mot de passe, ViewState
+# et jsessionid sont masqués avant écriture. Les réponses réussies peuvent être échantillonnées
+# pour suivre l'évolution des tailles de payload.
+
+import os
+import re
+import gzip
+import time
+import queue
+import atexit
+import random
+import tempfile
+import threading
+from urllib.parse import quote, quote_plus
+from typing import Optional
+
+from atomicfile import write_atomic
+
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "onboard_captures")
+DEFAULT_MAX_FILES = 50
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+MASK = "***"
+
+_SLUG_RE = re.compile(r"[^\w.-]+")
+# <input ... name="javax.faces.ViewState" ... value="..."> (ordre des attributs quelconque)
+_VS_INPUT_RE = re.compile(r"<input\b[^>]*javax\.faces\.ViewState[^>]*>", re.IGNORECASE)
+_VALUE_ATTR_RE = re.compile(r'(\bvalue=")[^"]*(")', re.IGNORECASE)
+# <update id="j_id1:javax.faces.ViewState:0"><![CDATA[...]]></update> (partial-response)
+_VS_UPDATE_RE = re.compile(r"(ViewState[^\"]*\"\s*>\s*<!\[CDATA\[).*?(\]\]>)", re.DOTALL)
+# payload encodé : javax.faces.ViewState=... ; cookie de session réécrit dans les URL
+_VS_FORM_RE = re.compile(r"(javax\.faces\.ViewState=)[^&\s\"']*")
+_JSESSIONID_RE = re.compile(r"(;jsessionid=)[^?#&\s\"']*", re.IGNORECASE)
+
+
+def slug(name: str) -> str:
+    """'POST window 01/09 -> 08/09' -> 'POST_window_01_09_-_08_09' (nom de fichier sûr)."""
+    return _SLUG_RE.sub("_", name).strip("_")[:60] or "capture"
+
+
+def redact(text: str, secrets=()) -> str:
+    """Masque les secrets (tels quels et encodés URL) puis les ViewState et jsessionid."""
+    for secret in secrets:
+        for variant in {secret, quote_plus(secret), quote(secret, safe="")}:
+            text = text.replace(variant, MASK)
+    text = _VS_INPUT_RE.sub(lambda m: _VALUE_ATTR_RE.sub(rf"\g<1>{MASK}\g<2>", m.group(0)), text)
+    text = _VS_UPDATE_RE.sub(rf"\g<1>{MASK}\g<2>", text)
+    text = _VS_FORM_RE.sub(rf"\g<1>{MASK}", text)
+    return _JSESSIONID_RE.sub(rf"\g<1>{MASK}", text)
+
+
+class CaptureRing:
+    """
+    Anneau de captures d'un process. capture() ne fait que mettre en file (jamais bloquant :
+    si la file est pleine, la capture est abandonnée et comptée) ; masquage, compression,
+    écriture et éviction sont faits par le thread d'écriture.
+    Fichiers : <horodatage>_<seq>_<nom>_<statut>_<octets>.html.gz, triés par ancienneté.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIR, max_files: int = DEFAULT_MAX_FILES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, sample: float = 0.0, queue_size: int = 64):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.sample_rate = sample
+        self.secrets = set()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.seq = 0
+        self.dropped = 0
+        self.files = None   # [(chemin, taille)] du plus ancien au plus récent, lu au premier write
+
+    def add_secret(self, secret: Optional[str]):
+        if secret:
+            with self.lock:
+                self.secrets.add(secret)
+
+    def capture(self, name: str, text: str, status: Optional[int] = None) -> bool:
+        """Met une réponse en file d'écriture ; renvoie False si elle a été abandonnée."""
+        with self.lock:
+            self.seq += 1
+            item = (time.time(), self.seq, name, status, text)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._worker, name="captures", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def sample(self, name: str, text: str, status: Optional[int] = None) -> bool:
+        """Capture d'une réponse réussie, avec la probabilité sample_rate (0 = jamais)."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        return self.capture(name, text, status)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que la file soit écrite (au plus timeout secondes) ; True si tout est écrit."""
+        if self.thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"[WARN] capture debug non écrite ({item[2]}) : {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, ts: float, seq: int, name: str, status: Optional[int], text: str):
+        with self.lock:
+            secrets = tuple(self.secrets)
+        data = redact(text, secrets).encode("utf-8")
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(ts))
+        fname = f"{stamp}_{seq:05d}_{slug(name)}_{status if status is not None else 'na'}_{len(data)}.html.gz"
+        if self.files is None:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            self.files = self._scan()
+        path = os.path.join(self.directory, fname)
+        write_atomic(path, gzip.compress(data, mtime=int(ts)), mode=0o600)
+        self.files.append((path, os.path.getsize(path)))
+        self._evict()
+        print(f"-> capture debug : {path} ({len(data)} o)")
+
+    def _scan(self) -> list:
+        """Captures déjà présentes (runs précédents), du plus ancien au plus récent."""
+        files = []
+        for fname in sorted(os.listdir(self.directory)):
+            if fname.endswith(".html.gz"):
+                path = os.path.join(self.directory, fname)
+                try:
+                    files.append((path, os.path.getsize(path)))
+                except OSError:
+                    pass
+        return files
+
+    def _evict(self):
+        total = sum(size for _, size in self.files)
+        while self.files and (len(self.files) > self.max_files or total > self.max_bytes):
+            path, size = self.files.pop(0)
+            total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# anneau du process : configuré par get_ics.main (configure), utilisé par save_debug_response
+ring = CaptureRing()
+
+
+def configure(directory: Optional[str] = None, max_files: Optional[int] = None, max_bytes: Optional[int] = None,
+              sample: Optional[float] = None) -> CaptureRing:
+    if directory:
+        ring.directory = directory
+    if max_files is not None:
+        ring.max_files = max_files
+    if max_bytes is not None:
+        ring.max_bytes = max_bytes
+    if sample is not None:
+        ring.sample_rate = sample
+    return ring
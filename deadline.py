@@ -0,0 +1,80 @@
+# deadline.py — budget de temps d'un run, réparti entre les phases (login, navigation,
+# téléchargement, écriture). Chaque requête prend comme timeout le temps restant de la phase ;
+# quand le budget est épuisé, DeadlineExceeded annule le run (l'ancien ICS reste en place).
+
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# part de chaque phase ; une phase reçoit sa part du temps *restant* au moment où elle
+# commence, au prorata des phases qui restent (le temps non consommé profite aux suivantes)
+PHASES = (("login", 0.25), ("navigation", 0.25), ("download", 0.4), ("write", 0.1))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Budget du run ou de la phase en cours épuisé."""
+
+
+class Deadline:
+    """
+    Échéance d'un run : total secondes à partir de maintenant, bornée par not_after
+    (horloge monotone) si donné. Sans l'un ni l'autre, aucune limite.
+    """
+
+    def __init__(self, total: Optional[float] = None, not_after: Optional[float] = None, shares=PHASES,
+                 clock=time.monotonic):
+        self.clock = clock
+        now = clock()
+        ends = [t for t in (now + total if total else None, not_after) if t is not None]
+        self.end = min(ends) if ends else None
+        self.shares = dict(shares)
+        self.order = [name for name, _ in shares]
+        self.phase_name = None
+        self.phase_end = self.end
+
+    def remaining(self) -> float:
+        if self.phase_end is None:
+            return float("inf")
+        return self.phase_end - self.clock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Borne le bloc à la part de `name` dans le temps restant du run, sans dépasser la fin
+        de la phase englobante (ex. write ouverte pendant download).
+        """
+        previous = (self.phase_name, self.phase_end)
+        self.phase_name = name
+        if self.end is not None and name in self.shares:
+            rest = self.order[self.order.index(name):]
+            weight = self.shares[name] / sum(self.shares[n] for n in rest)
+            now = self.clock()
+            self.phase_end = min(self.phase_end, now + max(0.0, self.end - now) * weight)
+        try:
+            self.check()
+            yield self
+        finally:
+            self.phase_name, self.phase_end = previous
+
+    def exceeded(self, what: str = "") -> DeadlineExceeded:
+        scope = f"phase {self.phase_name}" if self.phase_name else "run"
+        return DeadlineExceeded(f"budget de temps épuisé ({scope}{' : ' + what if what else ''})")
+
+    def check(self, what: str = ""):
+        if self.remaining() <= 0:
+            raise self.exceeded(what)
+
+    def timeout(self, default):
+        """Timeout (connexion, lecture) d'une requête : le défaut, raccourci au temps restant."""
+        self.check("requête")
+        left = self.remaining()
+        if isinstance(default, tuple):
+            return tuple(min(t, left) for t in default)
+        return min(default, left)
+
+    def sleep(self, seconds: float):
+        """time.sleep qui échoue tout de suite si la pause dépasse le budget restant."""
+        if seconds >= self.remaining():
+            raise self.exceeded(f"pause de {seconds:.1f} s")
+        if seconds > 0:
+            time.sleep(seconds)
@@ -0,0 +1,137 @@
+# event_store.py — base SQLite locale des événements (mode plage) : index par UID et par
+# date de début, historique vu la première fois / dernière fois / dernier changement, et
+# date de dernier téléchargement de chaque fenêtre pour ne rafraîchir que ce qui peut bouger.
+
+import time
+import sqlite3
+import threading
+from datetime import date
+from typing import Optional
+
+from ics_digest import event_hash
+from ics_stream import Event
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    uid          TEXT PRIMARY KEY,
+    start        TEXT NOT NULL,
+    end          TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    hash         TEXT NOT NULL,
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    last_changed REAL NOT NULL,
+    deleted_at   REAL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events(start) WHERE deleted_at IS NULL;
+CREATE TABLE IF NOT EXISTS windows (
+    a          TEXT NOT NULL,
+    b          TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    events     INTEGER NOT NULL,
+    PRIMARY KEY (a, b)
+);
+"""
+
+# âge max d'une fenêtre selon son éloignement (jours entre aujourd'hui et son début) :
+# les semaines proches à chaque run, le lointain de moins en moins souvent
+REFRESH_TIERS = ((14, 0), (60, 6 * 3600), (180, 24 * 3600), (None, 3 * 24 * 3600))
+# fenêtres entièrement passées : ne bougent presque plus
+PAST_MAX_AGE = 7 * 24 * 3600
+
+
+def ics_bound(d: date) -> str:
+    """Borne de fenêtre au format des dates ICS stockées (heure locale, minuit)."""
+    return d.strftime("%Y%m%dT000000")
+
+
+def max_age(a: date, b: date, today: date) -> float:
+    if b <= today:
+        return PAST_MAX_AGE
+    ahead = (a - today).days
+    for limit, age in REFRESH_TIERS:
+        if limit is None or ahead < limit:
+            return age
+    return 0
+
+
+class EventStore:
+    """Événements d'un compte ; une connexion partagée, sérialisée par un verrou."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def due_windows(self, windows: list, today: Optional[date] = None, now: Optional[float] = None) -> list:
+        """Fenêtres jamais téléchargées ou plus vieilles que max_age."""
+        today = today or date.today()
+        now = now if now is not None else time.time()
+        with self.lock:
+            fetched = dict(((a, b), t) for a, b, t in self.db.execute("SELECT a, b, fetched_at FROM windows"))
+        due = []
+        for a, b in windows:
+            t = fetched.get((a.isoformat(), b.isoformat()))
+            if t is None or now - t >= max_age(a, b, today):
+                due.append((a, b))
+        return due
+
+    def sync_window(self, a: date, b: date, events: list, now: Optional[float] = None) -> tuple:
+        """
+        Remplace le contenu de [a, b[ par `events` (normalisés). Les événements de la fenêtre
+        absents de la réponse sont marqués supprimés. Renvoie (ajoutés, modifiés, supprimés).
+        """
+        now = now if now is not None else time.time()
+        lo, hi = ics_bound(a), ics_bound(b)
+        added = changed = 0
+        with self.lock, self.db:
+            seen = set()
+            for ev in events:
+                h = event_hash(ev)
+                seen.add(ev.uid)
+                row = self.db.execute("SELECT hash, deleted_at FROM events WHERE uid = ?", (ev.uid,)).fetchone()
+                if row is None:
+                    added += 1
+                    self.db.execute(
+                        "INSERT INTO events (uid, start, end, title, hash, first_seen, last_seen, last_changed)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (ev.uid, ev.start, ev.end, ev.title, h, now, now, now))
+                elif row[0] != h or row[1] is not None:
+                    changed += 1
+                    self.db.execute(
+                        "UPDATE events SET start = ?, end = ?, title = ?, hash = ?, last_seen = ?,"
+                        " last_changed = ?, deleted_at = NULL WHERE uid = ?",
+                        (ev.start, ev.end, ev.title, h, now, now, ev.uid))
+                else:
+                    self.db.execute("UPDATE events SET last_seen = ? WHERE uid = ?", (now, ev.uid))
+            gone = [uid for (uid,) in self.db.execute(
+                "SELECT uid FROM events WHERE start >= ? AND start < ? AND deleted_at IS NULL", (lo, hi))
+                if uid not in seen]
+            self.db.executemany("UPDATE events SET deleted_at = ?, last_changed = ? WHERE uid = ?",
+                                [(now, now, uid) for uid in gone])
+            self.db.execute("INSERT OR REPLACE INTO windows (a, b, fetched_at, events) VALUES (?, ?, ?, ?)",
+                            (a.isoformat(), b.isoformat(), now, len(seen)))
+        return added, changed, len(gone)
+
+    def iter_range(self, start: date, end: date):
+        """Événements actifs dont le début est dans [start, end[, triés (requête sur l'index)."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT uid, start, end, title FROM events"
+                " WHERE start >= ? AND start < ? AND deleted_at IS NULL ORDER BY start, uid",
+                (ics_bound(start), ics_bound(end))).fetchall()
+        for uid, s, e, title in rows:
+            yield Event.from_title(uid, s, e, title)
+
+    def history(self, uid: str) -> Optional[dict]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT first_seen, last_seen, last_changed, deleted_at FROM events WHERE uid = ?", (uid,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("first_seen", "last_seen", "last_changed", "deleted_at"), row))
@@ -0,0 +1,134 @@
+# feed_server.py — petit serveur HTTP local qui sert le dernier ICS valide depuis la mémoire,
+# avec ETag fort, Last-Modified et réponses 304 (If-None-Match / If-Modified-Since).
+# Le rafraîchissement tourne à côté (voir get_ics.serve) : servir ne l'attend jamais.
+
+import os
+import time
+import hashlib
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FeedSnapshot:
+    """Contenu figé d'un flux : les handlers le lisent sans verrou, il n'est jamais modifié."""
+
+    __slots__ = ("body", "etag", "last_modified", "http_date")
+
+    def __init__(self, body: bytes, last_modified: Optional[float] = None):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        # HTTP n'a qu'une précision à la seconde
+        self.last_modified = int(last_modified if last_modified is not None else time.time())
+        self.http_date = formatdate(self.last_modified, usegmt=True)
+
+
+class FeedStore:
+    """Derniers ICS valides par nom de flux ; publish() remplace un flux d'un seul coup."""
+
+    def __init__(self):
+        self.feeds = {}
+        self.lock = threading.Lock()
+
+    def publish(self, name: str, body: bytes, last_modified: Optional[float] = None) -> bool:
+        """Publie body sous name ; renvoie False si le contenu est identique (ETag et date conservés)."""
+        snap = FeedSnapshot(body, last_modified)
+        with self.lock:
+            old = self.feeds.get(name)
+            if old is not None and old.etag == snap.etag:
+                return False
+            self.feeds[name] = snap
+        return True
+
+    def publish_file(self, name: str, path: str) -> bool:
+        with open(path, "rb") as f:
+            body = f.read()
+        return self.publish(name, body, os.path.getmtime(path))
+
+    def names(self) -> list:
+        with self.lock:
+            return sorted(self.feeds)
+
+    def get(self, name: str) -> Optional[FeedSnapshot]:
+        with self.lock:
+            if name is None and len(self.feeds) == 1:
+                return next(iter(self.feeds.values()))
+            return self.feeds.get(name)
+
+
+def not_modified(snap: FeedSnapshot, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """Règles de RFC 7232 : If-None-Match prime ; If-Modified-Since n'est lu qu'en son absence."""
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # comparaison faible autorisée pour GET : W/"x" correspond à "x"
+        return "*" in tags or any((t[2:] if t.startswith("W/") else t) == snap.etag for t in tags)
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        return snap.last_modified <= since
+    return False
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    server_version = "onboard-feed/1"
+    store: FeedStore = None
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool):
+        name = self.path.split("?", 1)[0].lstrip("/") or None
+        snap = self.store.get(name)
+        if snap is None:
+            names = self.store.names()
+            if not names:
+                # aucun planning encore récupéré : le client réessaiera
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.send_header("Retry-After", "60")
+                self.end_headers()
+                return
+            # flux inconnu, ou « / » alors que plusieurs flux sont servis : 404 avec leur liste
+            body = "".join(f"/{n}\n" for n in names).encode("utf-8")
+            self.send_response(404)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+        if not_modified(snap, self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since")):
+            self.send_response(304)
+            self._validators(snap)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Length", str(len(snap.body)))
+        self._validators(snap)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(snap.body)
+
+    def _validators(self, snap: FeedSnapshot):
+        self.send_header("ETag", snap.etag)
+        self.send_header("Last-Modified", snap.http_date)
+        self.send_header("Cache-Control", "no-cache")
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_feed_server(store: FeedStore, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    """Démarre le serveur dans un thread démon ; server.shutdown() pour l'arrêter."""
+    handler = type("BoundFeedHandler", (FeedHandler,), {"store": store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="feed-server", daemon=True).start()
+    return server
@@ -0,0 +1,109 @@
+# feeds.py — flux filtrés (par cours, type, salle, enseignant) tirés d'un seul téléchargement :
+# un unique passage sur les événements range chacun dans tous les flux qui le retiennent,
+# au lieu d'un login + scraping complet par flux.
+
+import os
+import re
+import json
+from typing import Optional
+
+FIELDS = ("course", "kind", "room", "teacher")
+
+
+def _values(value) -> Optional[frozenset]:
+    """"PROD" ou ["PROD", "OPTIM"] -> ensemble comparable (casse ignorée) ; None si absent."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(str(v).strip().casefold() for v in value)
+
+
+def feed_output(base_output: str, name: str) -> str:
+    """planning.ics + "prod" -> planning_prod.ics, dans le même dossier que la sortie principale."""
+    stem, ext = os.path.splitext(base_output)
+    return f"{stem}_{name}{ext or '.ics'}"
+
+
+class FeedFilter:
+    """
+    Un flux filtré. Les critères présents se combinent en ET, les valeurs d'un même
+    critère en OU ; les événements à intitulé non structuré ne passent que par `title`.
+    """
+
+    __slots__ = ("name", "output", "course", "kind", "room", "teacher", "title_re")
+
+    def __init__(self, name: str, output: str, course=None, kind=None, room=None, teacher=None,
+                 title: Optional[str] = None):
+        self.name = name
+        self.output = output
+        self.course = _values(course)
+        self.kind = _values(kind)
+        self.room = _values(room)
+        self.teacher = _values(teacher)
+        self.title_re = re.compile(title, re.IGNORECASE) if title else None
+
+    def matches(self, ev) -> bool:
+        for attr in FIELDS:
+            wanted = getattr(self, attr)
+            if wanted is not None:
+                value = getattr(ev, attr)
+                if value is None or value.casefold() not in wanted:
+                    return False
+        if self.title_re is not None and not self.title_re.search(ev.title):
+            return False
+        return True
+
+    def __repr__(self):
+        return f"FeedFilter({self.name!r}, {self.output!r})"
+
+
+def load_feeds(path: str, base_output: str = "planning.ics", username: str = "") -> list:
+    """
+    Lit la définition des flux filtrés depuis un fichier JSON :
+      [{"name": "prod", "course": "PROD"},
+       {"name": "exams", "kind": ["DS"]},
+       {"name": "c008", "room": "C008", "output": "salles/c008_{username}.ics"}]
+    Critères possibles : course, kind, room, teacher (valeur ou liste), title (regex).
+    "output" vaut <sortie principale>_<name>.ics par défaut.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    feeds, outputs = [], set()
+    for entry in raw:
+        name = entry.get("name")
+        if not name or not re.fullmatch(r"[\w.-]+", name):
+            raise ValueError(f"Nom de flux invalide : {name!r} (lettres, chiffres, . _ -)")
+        criteria = {key: entry[key] for key in FIELDS if entry.get(key) is not None}
+        if not criteria and not entry.get("title"):
+            raise ValueError(f"Le flux {name} n'a aucun critère (course, kind, room, teacher, title)")
+        output = entry.get("output")
+        output = output.format(username=username) if output else feed_output(base_output, name)
+        if output in outputs or os.path.abspath(output) == os.path.abspath(base_output):
+            raise ValueError(f"Sortie du flux {name} déjà utilisée : {output}")
+        outputs.add(output)
+        feeds.append(FeedFilter(name, output, title=entry.get("title"), **criteria))
+    return feeds
+
+
+class FeedSet:
+    """
+    Répartit les événements entre les flux pendant qu'ils passent vers la sortie principale :
+    sort() laisse passer le flux d'événements et remplit buckets au vol.
+    """
+
+    def __init__(self, feeds: list):
+        self.feeds = feeds
+        self.buckets = [[] for _ in feeds]
+
+    def sort(self, events):
+        self.buckets = [[] for _ in self.feeds]
+        pairs = list(zip(self.feeds, self.buckets))
+        for ev in events:
+            for feed, bucket in pairs:
+                if feed.matches(ev):
+                    bucket.append(ev)
+            yield ev
+
+    def items(self):
+        return zip(self.feeds, self.buckets)
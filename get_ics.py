@@ -7,19 +7,30 @@ import re
 import sys
 import time
 import json
-import shutil
 import tempfile
-import hashlib
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import argparse
+import random
+import threading
+from datetime import datetime, date as date_cls, timedelta
+from zoneinfo import ZoneInfo
 from urllib.parse import urljoin
 from typing import Optional
-
-import requests
-from bs4 import BeautifulSoup
-from icalendar import Calendar, Event
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# requests, icalendar et xml.etree (jsf_parser) sont importés dans les fonctions qui s'en servent :
+# le flow normal n'utilise pas icalendar, et importer le module reste quasi gratuit
+from jsf_parser import parse_jsf_response
+from jsf_ids import ComponentIdResolver
+import metrics
+import captures
+from atomicfile import write_atomic
+from deadline import Deadline, DeadlineExceeded
+from ics_stream import iter_events, iter_raw_events, normalize_event, iter_ics_lines, write_ics, IcsChecker, CheckingWriter
+from ics_digest import CalendarDigest, digest_path, format_diff
 
 def save_ics_from_partial_response(partial_response: str, filename: str = "planning.ics"):
+    from icalendar import Calendar, Event
+
     # Chercher la portion JSON qui contient "events"
     match = re.search(r'\{ *"events" *: *\[.*?\]\}', partial_response, re.DOTALL)
     if not match:
@@ -55,112 +66,78 @@ def save_ics_from_partial_response(partial_response: str, filename: str = "plann
         
         
         
-BASE = "https://onboard.ec-nantes.fr"
+# ONBOARD_BASE permet de viser un autre serveur (ex: bench/mock_onboard.py en local)
+BASE = os.environ.get("ONBOARD_BASE", "https://onboard.ec-nantes.fr").rstrip("/")
 LOGIN_PAGE = BASE + "/faces/Login.xhtml"
 MAINMENU_PAGE = BASE + "/faces/MainMenuPage.xhtml"
 PLANNING_PAGE = BASE + "/faces/Planning.xhtml"
 
 UA = "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:142.0) Gecko/20100101 Firefox/142.0"
 
-# récupère mot de passe et user
-password = os.environ.get("ONBOARD_PASS")
-if not password:
-    # Ne pas écraser l'ancien planning si ONBOARD_PASS manquant
-    print("Erreur: la variable d'environnement ONBOARD_PASS n'est pas définie. Ajouter dans Settings → Secrets.")
-    # Le script termine normalement sans remplacer l'ICS.
-    sys.exit(0)
-
 USERNAME = os.environ.get("ONBOARD_USER", "mseverac2023")
-
-# session
-session = requests.Session()
-session.headers.update({"User-Agent": UA})
-current_viewstate = None
-new_id = None
+DEFAULT_CONCURRENCY = int(os.environ.get("ONBOARD_CONCURRENCY", "8"))
+# au-delà de cet âge (secondes) le cache de session n'est même pas sondé
+SESSION_CACHE_MAX_AGE = int(os.environ.get("ONBOARD_SESSION_MAX_AGE", str(6 * 3600)))
+# débit max vers OnBoard (requêtes/s) et rafale autorisée, par session
+RATE_LIMIT = float(os.environ.get("ONBOARD_RATE", "2.0"))
+RATE_BURST = int(os.environ.get("ONBOARD_BURST", "3"))
+# validation complète icalendar en plus du contrôle structurel (lent sur les gros flux)
+STRICT_ICS = os.environ.get("ONBOARD_STRICT_ICS", "") not in ("", "0")
+# mode plage : découpage, nombre de fenêtres téléchargées en parallèle, nouveaux essais par fenêtre
+DEFAULT_WINDOW = os.environ.get("ONBOARD_WINDOW", "week")
+WINDOW_WORKERS = int(os.environ.get("ONBOARD_WINDOW_WORKERS", "4"))
+WINDOW_RETRIES = int(os.environ.get("ONBOARD_WINDOW_RETRIES", "2"))
+PARIS = ZoneInfo("Europe/Paris")
+# transport HTTP : pool, nouveaux essais (GET + POST AJAX sans effet de bord), timeouts
+HTTP_POOL = int(os.environ.get("ONBOARD_HTTP_POOL", "10"))
+HTTP_RETRIES = int(os.environ.get("ONBOARD_HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.environ.get("ONBOARD_HTTP_BACKOFF", "0.5"))
+HTTP_TIMEOUT = (float(os.environ.get("ONBOARD_CONNECT_TIMEOUT", "5")),
+                float(os.environ.get("ONBOARD_READ_TIMEOUT", "30")))
+# nombre de reprises depuis le dernier état valide avant d'abandonner le run
+RESUME_ATTEMPTS = int(os.environ.get("ONBOARD_RESUME_ATTEMPTS", "2"))
+# traces verbeuses (clés de payload, début des réponses) : ONBOARD_DEBUG=1 ou --debug
+DEBUG = os.environ.get("ONBOARD_DEBUG", "") not in ("", "0")
+# code de sortie quand aucun planning n'a changé (le workflow saute alors le déploiement)
+EXIT_UNCHANGED = 3
+
+# budget de temps d'un run (s, 0 = illimité), réparti entre login / navigation / téléchargement /
+# écriture ; les timeouts des requêtes en sont déduits
+RUN_DEADLINE = float(os.environ.get("ONBOARD_DEADLINE", "600"))
+# verrou contre les runs qui se chevauchent ; repris si son process est mort ou s'il est trop vieux
+LOCK_PATH = os.environ.get("ONBOARD_LOCK", ".get_ics.lock")
+LOCK_STALE = float(os.environ.get("ONBOARD_LOCK_STALE", "0")) or None
+EXIT_LOCKED = 4
+
+# captures de debug (réponses en erreur, et échantillon des réponses OK) : hors du dossier publié
+CAPTURE_DIR = os.environ.get("ONBOARD_CAPTURE_DIR", captures.DEFAULT_DIR)
+CAPTURE_MAX_FILES = int(os.environ.get("ONBOARD_CAPTURE_MAX_FILES", str(captures.DEFAULT_MAX_FILES)))
+CAPTURE_MAX_MB = float(os.environ.get("ONBOARD_CAPTURE_MAX_MB", str(captures.DEFAULT_MAX_BYTES / 2 ** 20)))
+CAPTURE_SAMPLE = float(os.environ.get("ONBOARD_CAPTURE_SAMPLE", "0"))
+# mode serveur : période de rafraîchissement et gigue (secondes)
+SERVE_INTERVAL = float(os.environ.get("ONBOARD_INTERVAL", "900"))
+SERVE_JITTER = float(os.environ.get("ONBOARD_JITTER", "60"))
 
 # ---------- Helpers ----------
-def save_debug_response(name, response_text):
-    """Sauvegarde la réponse textuelle pour debug (HTML ou XML partial)."""
-    fname = f"debug_response_{name}.html"
-    try:
-        with open(fname, "w", encoding="utf-8") as f:
-            f.write(response_text)
-        print(f"-> debug saved: {fname} (len={len(response_text)})")
-    except Exception as e:
-        print(f"[WARN] impossible d'écrire debug file {fname}: {e}")
-
-def extract_viewstate_from_html(html: str) -> Optional[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    inp = soup.find("input", {"name": "javax.faces.ViewState"})
-    if inp and inp.get("value"):
-        return inp["value"]
-    return None
-
-def extract_viewstate_from_jsf_partial(xml_text: str) -> Optional[str]:
-    try:
-        root = ET.fromstring(xml_text)
-    except ET.ParseError:
-        return None
-    for upd in root.findall('.//update'):
-        id_attr = upd.get('id') or ''
-        if 'ViewState' in id_attr or 'javax.faces.ViewState' in id_attr:
-            return (upd.text or '').strip()
-    return None
+def save_debug_response(name, response_text, status: Optional[int] = None):
+    """
+    Garde la réponse textuelle pour debug (HTML ou XML partial) dans l'anneau de captures :
+    masquée, compressée et écrite en arrière-plan dans CAPTURE_DIR.
+    """
+    if not captures.ring.capture(name, response_text, status):
+        print(f"[WARN] capture debug abandonnée (file pleine) : {name}")
 
 def ensure_success(r, context="request"):
     if r.status_code >= 400:
         print(f"[ERROR] {context} returned HTTP {r.status_code}")
         # sauvegarde debug
         try:
-            save_debug_response(context, r.text)
+            save_debug_response(context, r.text, r.status_code)
         except:
             pass
         raise RuntimeError(f"HTTP {r.status_code} for {context}")
 
-# ---------- ID replacement helpers ----------
-def replace_id(payload: dict, schedule_id: str, old_id: str):
-    print(f"[replace_id] remplacement automatique : {old_id} -> {schedule_id}")
-    for key in list(payload.keys()):
-        if old_id in key:
-            new_key = key.replace(old_id, schedule_id)
-            payload[new_key] = payload.pop(key)
-    for key in list(payload.keys()):
-        if isinstance(payload[key], str) and payload[key] == old_id:
-            payload[key] = schedule_id
-
-def get_old_id(payload: dict) -> Optional[str]:
-    old_candidates = set()
-    for v in payload.values():
-        if isinstance(v, str):
-            for m in re.findall(r'(form:j_idt\d+)', v):
-                old_candidates.add(m)
-    for k in list(payload.keys()):
-        for m in re.findall(r'(form:j_idt\d+)', k):
-            old_candidates.add(m)
-    old_id = None
-    if isinstance(payload.get("javax.faces.source"), str) and re.match(r'form:j_idt\d+', payload.get("javax.faces.source")):
-        old_id = payload.get("javax.faces.source")
-    elif old_candidates:
-        old_id = next(iter(old_candidates))
-    return old_id
-
-# ---------- robust POST for JSF/PrimeFaces ----------
-def requete_post(payload: dict, name: str, url: Optional[str]=None, ajax: bool=False, extra_headers: dict=None, pause: float=1.0):
-    global current_viewstate, session, new_id
-
-    if new_id is not None:
-        old_id = get_old_id(payload)
-        if old_id:
-            replace_id(payload, new_id, old_id)
-
-    if url is None:
-        url = MAINMENU_PAGE
-
-    # inject ViewState si absent
-    if 'javax.faces.ViewState' not in payload or not payload.get('javax.faces.ViewState'):
-        if current_viewstate:
-            payload['javax.faces.ViewState'] = current_viewstate
-
+def post_headers(url: Optional[str], ajax: bool) -> dict:
     headers = {
         "Origin": BASE,
         "Referer": url if url else BASE + "/",
@@ -177,72 +154,135 @@ def requete_post(payload: dict, name: str, url: Optional[str]=None, ajax: bool=F
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Content-Type": "application/x-www-form-urlencoded",
         })
+    return headers
 
-    if extra_headers:
-        headers.update(extra_headers)
+def is_login_page(r) -> bool:
+    """Vrai si la réponse est (ou redirige vers) la page de login : session expirée."""
+    if "Login.xhtml" in (r.url or ""):
+        return True
+    return 'id="formulaireSpring"' in r.text or 'name="password"' in r.text
 
-    print(f"POST {name} -> {url} (ajax={ajax})")
-    print(f"payload before POST: keys={list(payload.keys())}")
+class SessionExpired(RuntimeError):
+    """Le serveur a répondu par la page de login : il faut repartir d'un login complet."""
 
-    r = session.post(url, data=payload, headers=headers, allow_redirects=True)
-    ensure_success(r, f"POST {name}")
+_SCHEDULE_WIDGET_RE = re.compile(r'PrimeFaces\.cw\("Schedule"')
 
-    # Analysis: try XML partial first, else HTML fallback
-    schedule_id = None
-    collected_hidden = {}
-    new_vs = None
+def is_planning_page(text: str) -> bool:
+    return bool(_SCHEDULE_WIDGET_RE.search(text))
 
-    # try XML parse
+# ---------- Pacing ----------
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons, thread-safe : `rate` jetons/s, au plus `burst` en réserve.
+    acquire() bloque juste le temps nécessaire et renvoie la durée d'attente (s).
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, burst: int = RATE_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # jetons négatifs = dette : on réserve le créneau puis on dort hors du verrou
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+# ---------- Cache de session (opt-in) ----------
+def session_cache_path(cache_dir: str, username: str) -> str:
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', username)
+    return os.path.join(cache_dir, f"session_{safe}.json")
+
+def event_store_path(store_dir: str, username: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", username)
+    return os.path.join(store_dir, f"events_{safe}.sqlite")
+
+def write_private_json(path: str, data: dict):
+    """Écrit data en JSON avec des permissions 0600 (dossier 0700), remplacement atomique."""
+    write_atomic(path, json.dumps(data), mode=0o600, dir_mode=0o700)
+
+def read_private_json(path: str) -> Optional[dict]:
+    """Relit un fichier écrit par write_private_json ; refuse s'il est lisible par d'autres."""
     try:
-        root = ET.fromstring(r.text)
-        for upd in root.findall(".//update"):
-            upd_id = upd.get("id") or ""
-            upd_text = upd.text or ""
-            m = re.search(r'id\s*:\s*"([^"]+)"', upd_text)
-            if m:
-                candidate = m.group(1)
-                if re.match(r'form:j_idt\d+', candidate):
-                    schedule_id = candidate
-            if not schedule_id:
-                m2 = re.search(r'(form:j_idt\d+)', upd_id)
-                if m2:
-                    schedule_id = m2.group(1)
-            soup_upd = BeautifulSoup(upd_text, "html.parser")
-            for inp in soup_upd.find_all("input", {"type": "hidden"}):
-                name = inp.get("name") or inp.get("id")
-                value = inp.get("value", "")
-                if name:
-                    collected_hidden[name] = value
-        new_vs = extract_viewstate_from_jsf_partial(r.text)
-    except ET.ParseError:
-        # fallback to HTML parsing
-        soup = BeautifulSoup(r.text, "html.parser")
-        for inp in soup.find_all("input", {"type": "hidden"}):
-            name = inp.get("name") or inp.get("id")
-            value = inp.get("value", "")
-            if name:
-                collected_hidden[name] = value
-        m = re.search(r'PrimeFaces\.cw\("Schedule".*?id\s*:\s*"([^"]+)"', r.text)
-        if m:
-            schedule_id = m.group(1)
-        else:
-            m2 = re.search(r'<update id="(form:j_idt\d+)"', r.text)
-            if m2:
-                schedule_id = m2.group(1)
-        new_vs = extract_viewstate_from_html(r.text) or extract_viewstate_from_jsf_partial(r.text)
-
-    # merge collected hidden into payload if missing
-    for k, v in collected_hidden.items():
-        if k not in payload or not payload.get(k):
-            payload[k] = v
-
-    if new_vs:
-        if new_vs != current_viewstate:
-            print(f"[viewstate] mis à jour après {name} (len={len(new_vs)})")
-        current_viewstate = new_vs
-        payload["javax.faces.ViewState"] = current_viewstate
-
-    # detect old_id and replace if schedule_id found
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if st.st_mode & 0o077:
+        print(f"[WARN] {path} a des permissions trop ouvertes ({oct(st.st_mode & 0o777)}) -> ignoré")
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] cache illisible {path}: {e}")
+        return None
+
+# ---------- Fenêtres de dates (mode plage) ----------
+def parse_date(value: str) -> date_cls:
+    """Accepte JJ/MM/AAAA (format OnBoard) ou AAAA-MM-JJ."""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Date invalide : {value!r} (attendu JJ/MM/AAAA ou AAAA-MM-JJ)")
+
+def split_windows(start: date_cls, end: date_cls, unit: str = "week") -> list:
+    """
+    Découpe [start, end] (bornes incluses) en fenêtres [a, b[ alignées sur la semaine
+    (lundi) ou le mois calendaire, comme les vues agendaWeek / month du schedule.
+    """
+    if end < start:
+        raise ValueError("fin de plage avant le début")
+    if unit == "week":
+        a = start - timedelta(days=start.weekday())
+        step = lambda d: d + timedelta(days=7)
+    elif unit == "month":
+        a = start.replace(day=1)
+        step = lambda d: (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    else:
+        raise ValueError(f"Découpage inconnu : {unit!r} (week ou month)")
+    windows = []
+    while a <= end:
+        b = step(a)
+        windows.append((a, b))
+        a = b
+    return windows
+
+def window_params(a: date_cls, b: date_cls) -> dict:
+    """Paramètres JSF d'une fenêtre : bornes en ms epoch (minuit Paris), date, semaine ISO, fuseau."""
+    start_dt = datetime(a.year, a.month, a.day, tzinfo=PARIS)
+    end_dt = datetime(b.year, b.month, b.day, tzinfo=PARIS)
+    return {
+        "start": str(int(start_dt.timestamp() * 1000)),
+        "end": str(int(end_dt.timestamp() * 1000)),
+        "date_input": a.strftime("%d/%m/%Y"),
+        "week": f"{a.isocalendar()[1]}-{a.isocalendar()[0]}",
+        "offset": str(-int(start_dt.utcoffset().total_seconds() * 1000)),
+    }
+
+# ---------- ID replacement helpers ----------
+def replace_id(payload: dict, schedule_id: str, old_id: str):
+    print(f"[replace_id] remplacement automatique : {old_id} -> {schedule_id}")
+    for key in list(payload.keys()):
+        if old_id in key:
+            new_key = key.replace(old_id, schedule_id)
+            payload[new_key] = payload.pop(key)
+    for key in list(payload.keys()):
+        if isinstance(payload[key], str) and payload[key] == old_id:
+            payload[key] = schedule_id
+
+def get_old_id(payload: dict) -> Optional[str]:
     old_candidates = set()
     for v in payload.values():
         if isinstance(v, str):
@@ -256,104 +296,95 @@ def requete_post(payload: dict, name: str, url: Optional[str]=None, ajax: bool=F
         old_id = payload.get("javax.faces.source")
     elif old_candidates:
         old_id = next(iter(old_candidates))
-
-    if schedule_id:
-        print("schedule_id détecté:", schedule_id)
-        if old_id and old_id != schedule_id:
-            new_id = schedule_id
-            replace_id(payload, schedule_id, old_id)
-        payload["javax.faces.source"] = schedule_id
-        payload["javax.faces.partial.execute"] = schedule_id
-        payload["javax.faces.partial.render"] = schedule_id
-        payload[schedule_id] = schedule_id
-
-    if pause:
-        time.sleep(pause)
-
-    print(f"POST {name} done (len response={len(r.text)})")
-    return r
+    return old_id
 
 # ---------- ICS generation & safe write ----------
 def generate_ics_from_partial_response(response_text: str) -> str:
     """
     Extrait le JSON présent dans une réponse partielle JSF (ex: '[{...}]') puis génère
     un texte ICS (string). Lève ValueError si JSON non trouvé ou format inattendu.
+    Pour les grandes plages, préférer write_events_safely(iter_events(...)) qui ne
+    construit pas le texte complet en mémoire.
     """
-    m = re.search(r'\[\{.*\}\]', response_text, re.DOTALL)
-    if not m:
-        raise ValueError("Impossible de trouver le JSON des événements dans la réponse.")
-    events_json = m.group(0)
-    events = json.loads(events_json)
-
-    # Construction du ICS en string (on garde le format UTC natif)
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//Onboard//Planning//FR",
-        "CALSCALE:GREGORIAN",
-    ]
-
-    # Certains payloads ont events encapsulés différemment : on assure robustesse
-    # On suppose events est une liste, et events[0]["events"] contient la liste réelle
-    evt_container = events[0].get("events") if isinstance(events, list) and events else None
-    if evt_container is None:
-        # peut-être events est déjà la liste d'événements
-        if isinstance(events, list) and all(isinstance(x, dict) and "start" in x for x in events):
-            evt_container = events
-        else:
-            raise ValueError("Format JSON inattendu pour les événements.")
-
-    def to_ics_date(dt_str):
-        # exemple: "2025-09-08T10:15:00+0200"
-        dt = datetime.strptime(dt_str, "%Y-%m-%dT%H:%M:%S%z")
-        return dt.strftime("%Y%m%dT%H%M%S")
-
-    for ev in evt_container:
-        uid = (ev.get("id", "") or "") + "@onboard.ec-nantes.fr"
-        start = to_ics_date(ev["start"])
-        end = to_ics_date(ev["end"])
-        summary = (ev.get("title", "") or "").strip().replace("\n", " ").replace("\r", " ")
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTART;TZID=Europe/Paris:{start}",
-            f"DTEND;TZID=Europe/Paris:{end}",
-            f"SUMMARY:{summary}",
-            "END:VEVENT",
-        ]
-
-    lines.append("END:VCALENDAR")
-    return "\n".join(lines)
+    return "\n".join(iter_ics_lines(iter_events(response_text)))
 
-def write_ics_safely(ics_text: str, final_path="planning.ics"):
+def write_ics_safely(ics_text: str, final_path="planning.ics", strict: bool = STRICT_ICS):
     """
-    Écrit dans un fichier tmp, parse l'ICS avec icalendar et s'assure qu'il y a au moins 1 VEVENT,
-    puis remplace final_path atomiquement. Lève ValueError en cas de pb de validation.
+    Écrit dans un fichier tmp à côté de final_path en validant la structure ICS au fil de l'eau
+    (au moins 1 VEVENT), puis remplace final_path atomiquement. strict=True ajoute le parse
+    complet icalendar. Lève ValueError en cas de pb de validation.
     """
-    fd, tmp_path = tempfile.mkstemp(suffix=".ics.tmp")
-    os.close(fd)
-    try:
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            f.write(ics_text)
+    _write_validated(lambda f: f.write(ics_text), final_path, strict)
 
-        # Validation : parser l'ICS (binaire)
-        with open(tmp_path, "rb") as f:
-            try:
-                cal = Calendar.from_ical(f.read())
-            except Exception as e:
-                raise ValueError(f"Parse ICS failed: {e}")
+def write_events_safely(events, final_path="planning.ics", strict: bool = STRICT_ICS) -> int:
+    """
+    Variante streaming de write_ics_safely : les événements (générateur, cf. ics_stream.iter_events)
+    sont écrits un par un dans le fichier tmp. Même validation et remplacement atomique.
+    Renvoie le nombre d'événements écrits.
+    """
+    return _write_validated(lambda f: write_ics(events, f), final_path, strict)
 
-        has_event = any(comp.name == "VEVENT" for comp in cal.walk())
-        if not has_event:
-            raise ValueError("ICS parsed mais ne contient aucun VEVENT -> rejeté")
+def write_events_if_changed(events, final_path="planning.ics", strict: bool = STRICT_ICS,
+                            allow_empty: bool = False) -> bool:
+    """
+    Comme write_events_safely, mais compare le digest des événements à celui stocké à côté
+    de final_path (<final_path>.digest.json) : si rien n'a changé, le fichier n'est pas
+    réécrit. Sinon affiche un diff compact et met à jour le digest. Renvoie True si modifié.
+    allow_empty=True accepte un calendrier sans VEVENT (flux filtrés).
+    """
+    dpath = digest_path(final_path)
+    previous = CalendarDigest.load(dpath) if os.path.exists(final_path) else None
+    current = CalendarDigest()
+
+    def unchanged():
+        return previous is not None and previous.format == current.format and previous.digest == current.digest
+
+    n_events = _write_validated(lambda f: write_ics(current.track(events), f), final_path, strict, skip_if=unchanged,
+                                allow_empty=allow_empty)
+    if n_events is None:
+        print(f"= {final_path} inchangé ({len(current.events)} événements, digest {current.digest[:12]}) -> pas de réécriture")
+        return False
+    if previous is not None:
+        print(format_diff(*current.diff(previous)))
+    current.save(dpath)
+    return True
+
+def _write_validated(write_fn, final_path, strict: bool = False, skip_if=None, allow_empty: bool = False) -> Optional[int]:
+    # tmp dans le même dossier que la cible : os.replace reste un rename atomique
+    target_dir = os.path.dirname(os.path.abspath(final_path))
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(final_path) + ".", suffix=".tmp", dir=target_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            writer = CheckingWriter(f, IcsChecker(allow_empty))
+            write_fn(writer)
+            n_events = writer.close()
+            f.flush()
+            os.fsync(f.fileno())
 
         # taille minimale (heuristique)
-        if os.path.getsize(tmp_path) < 200:
+        if not allow_empty and os.path.getsize(tmp_path) < 200:
             raise ValueError("ICS trop petit -> rejeté")
 
+        if strict:
+            # Validation complète (opt-in) : parser l'ICS avec icalendar
+            from icalendar import Calendar
+            with open(tmp_path, "rb") as f:
+                try:
+                    cal = Calendar.from_ical(f.read())
+                except Exception as e:
+                    raise ValueError(f"Parse ICS failed: {e}")
+            if not allow_empty and not any(comp.name == "VEVENT" for comp in cal.walk()):
+                raise ValueError("ICS parsed mais ne contient aucun VEVENT -> rejeté")
+
+        if skip_if is not None and skip_if():
+            return None
+
         # remplacement atomique
-        shutil.move(tmp_path, final_path)
-        print(f"✅ {final_path} mis à jour en atomique.")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, final_path)
+        _fsync_dir(target_dir)
+        print(f"✅ {final_path} mis à jour en atomique ({n_events} VEVENT).")
+        return n_events
     finally:
         if os.path.exists(tmp_path):
             try:
@@ -361,57 +392,301 @@ def write_ics_safely(ics_text: str, final_path="planning.ics"):
             except:
                 pass
 
-# ---------- Script principal ----------
-def main():
-    global current_viewstate, session, new_id
-    if True :
-        print("GET login page...")
-        r = session.get(LOGIN_PAGE)
+def _fsync_dir(path: str):
+    """fsync du dossier pour rendre le rename durable (no-op là où ce n'est pas supporté)."""
+    try:
+        dir_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+# ---------- Client OnBoard (un compte = une session) ----------
+class OnboardClient:
+    """
+    Enchaîne login → MainMenuPage → Planning → dl_ics pour UN compte.
+    Tout l'état (session HTTP, ViewState courant, id JSF détecté) est porté par l'instance,
+    ce qui permet de faire tourner plusieurs comptes en parallèle dans le même process.
+    """
+
+    def __init__(self, username: str, password: str, output: str = "planning.ics", cache_dir: Optional[str] = None,
+                 limiter: Optional[TokenBucket] = None, store_dir: Optional[str] = None, full_sync: bool = False,
+                 feeds_config: Optional[str] = None, deadline: Optional[float] = RUN_DEADLINE,
+                 deadline_at: Optional[float] = None):
+        self.username = username
+        self.password = password
+        captures.ring.add_secret(password)
+        self.output = output
+        self.cache_path = session_cache_path(cache_dir, username) if cache_dir else None
+        # base d'événements locale (mode plage) : ne retélécharge que les fenêtres à rafraîchir
+        self.store_path = event_store_path(store_dir, username) if store_dir else None
+        self.store = None
+        self.full_sync = full_sync
+        # flux filtrés (--feeds) écrits à partir du même téléchargement que self.output
+        self.feeds = None
+        if feeds_config:
+            from feeds import FeedSet, load_feeds
+            self.feeds = FeedSet(load_feeds(feeds_config, output, username))
+            # dossiers des sorties ("salles/c008_{username}.ics") créés avant tout téléchargement
+            for feed in self.feeds.feeds:
+                os.makedirs(os.path.dirname(os.path.abspath(feed.output)), exist_ok=True)
+        self.feeds_changed = []
+        # budget de chaque run (secondes), borné par deadline_at (time.monotonic) si donné
+        self.deadline_s = deadline
+        self.deadline_at = deadline_at
+        self.deadline = Deadline()
+        from transport import make_session
+        # pas de nouveaux essais côté urllib3 : ils réutiliseraient le timeout d'origine et
+        # dépasseraient l'échéance ; les GET passent par retrying() (voir get)
+        self.session = make_session(UA, HTTP_POOL, 0, HTTP_BACKOFF, HTTP_TIMEOUT)
+        self.current_viewstate = None
+        self.new_id = None
+        # ids JSF découverts sur les pages ; new_id et les heuristiques ne servent qu'en repli
+        self.ids = ComponentIdResolver(os.path.join(cache_dir, "jsf_ids.json") if cache_dir else None)
+        self.limiter = limiter or TokenBucket()
+        self.last_jsf = None
+        self.changed = False
+        self.wait_time = 0.0
+        self.metrics = metrics.RunMetrics(username)
+        self.last_phase = None
+        # machine à états (voir _run) : dernier état atteint, et détour par le menu requis ou non
+        self.state = "start"
+        self.detour = None
+        self.largeur = "907"
+        self.id_init_val = None
+
+    def log(self, msg: str):
+        print(f"[{self.username}] {msg}")
+
+    def debug(self, msg: str):
+        if DEBUG:
+            self.log(msg)
+
+    # ---------- pacing ----------
+    def throttle(self):
+        """Passe par le limiteur de débit avant chaque requête HTTP."""
+        self.wait_time += self.limiter.acquire()
+        self.deadline.check("limiteur de débit")
+
+    def settle(self, ready: bool, fallback: float):
+        """
+        Détection de disponibilité : si la réponse précédente contient déjà le marqueur attendu
+        (ViewState / id du schedule), l'étape suivante part tout de suite. Sinon on garde
+        l'ancienne pause fixe en repli.
+        """
+        if ready or not fallback:
+            return
+        self.log(f"réponse sans marqueur attendu -> pause de repli {fallback} s")
+        self.deadline.sleep(fallback)
+        self.wait_time += fallback
+
+    def get(self, url: str, name: str = "get"):
+        from transport import retrying
+        self.throttle()
+        with self.metrics.phase(name, "GET") as rec:
+            # timeout recalculé à chaque essai, pauses bornées par le budget restant
+            send = lambda: self.session.get(url, timeout=self.deadline.timeout(HTTP_TIMEOUT))
+            r, rec["retries"] = retrying(send, HTTP_RETRIES, HTTP_BACKOFF, self.log, f"GET {name}",
+                                         sleep=self.deadline.sleep)
+            self.measure(rec, r)
+        self.last_phase = rec
+        if r.status_code < 400:
+            captures.ring.sample(f"GET {name}", r.text, r.status_code)
+        return r
+
+    def measure(self, rec: dict, r):
+        from transport import wire_bytes
+        rec["status"] = r.status_code
+        rec["response_bytes"] = len(r.content)
+        rec["wire_bytes"] = wire_bytes(r)
+
+    def note_viewstate(self, vs: Optional[str]):
+        """Complète la mesure de la dernière requête avec la taille du ViewState reçu."""
+        if self.last_phase is not None and vs:
+            self.last_phase["viewstate_bytes"] = len(vs)
+
+    def counted(self, events, rec: dict):
+        """Laisse passer le flux d'événements en les comptant dans la mesure rec."""
+        rec["events"] = 0
+        for ev in events:
+            rec["events"] += 1
+            if not rec["events"] % 500:
+                # échéance dépassée en cours d'écriture : le tmp est jeté, l'ancien ICS reste
+                self.deadline.check("écriture")
+            yield ev
+
+    def write_output(self, events):
+        with self.deadline.phase("write"):
+            with self.metrics.phase("write_ics", "WRITE") as rec:
+                if self.feeds is not None:
+                    events = self.feeds.sort(events)
+                self.changed = write_events_if_changed(self.counted(events, rec), final_path=self.output)
+            if self.feeds is not None:
+                self.write_feeds()
+
+    def write_feeds(self):
+        """Écrit les flux filtrés triés pendant l'écriture principale ; les inchangés ne sont pas réécrits."""
+        self.feeds_changed = []
+        with self.metrics.phase("write_feeds", "WRITE", f"{len(self.feeds.feeds)} flux") as rec:
+            rec["events"] = 0
+            for feed, events in self.feeds.items():
+                rec["events"] += len(events)
+                if write_events_if_changed(events, final_path=feed.output, allow_empty=True):
+                    self.feeds_changed.append(feed.output)
+        if self.feeds_changed:
+            self.changed = True
+        self.log(f"flux filtrés : {len(self.feeds_changed)}/{len(self.feeds.feeds)} réécrits")
+
+    def outputs(self) -> list:
+        """Fichier principal puis flux filtrés."""
+        return [self.output] + ([feed.output for feed in self.feeds.feeds] if self.feeds is not None else [])
+
+    # ---------- robust POST for JSF/PrimeFaces ----------
+    def requete_post(self, payload: dict, name: str, url: Optional[str]=None, ajax: bool=False, extra_headers: dict=None, pause: float=1.0,
+                     idempotent: bool = False):
+        """
+        POST JSF avec ViewState courant. idempotent=True (étapes sans effet de bord : sous-menu,
+        navigation, lecture du schedule) autorise les nouveaux essais sur erreur réseau / 429, 502,
+        503, 504 (jamais sur 500) ; le login n'est jamais rejoué.
+        """
+        self.ids.rewrite(payload)
+        if self.new_id is not None and not self.ids.resolved:
+            old_id = get_old_id(payload)
+            if old_id:
+                replace_id(payload, self.new_id, old_id)
+
+        if url is None:
+            url = MAINMENU_PAGE
+
+        # inject ViewState si absent
+        if 'javax.faces.ViewState' not in payload or not payload.get('javax.faces.ViewState'):
+            if self.current_viewstate:
+                payload['javax.faces.ViewState'] = self.current_viewstate
+
+        headers = post_headers(url, ajax)
+        if extra_headers:
+            headers.update(extra_headers)
+
+        self.log(f"POST {name} -> {url} (ajax={ajax})")
+        self.debug(f"payload before POST: keys={list(payload.keys())}")
+
+        self.throttle()
+        with self.metrics.phase(name, "POST") as rec:
+            send = lambda: self.session.post(url, data=payload, headers=headers, allow_redirects=True,
+                                             timeout=self.deadline.timeout(HTTP_TIMEOUT))
+            if idempotent:
+                from transport import POST_RETRY_STATUSES, retrying
+                r, rec["retries"] = retrying(send, HTTP_RETRIES, HTTP_BACKOFF, self.log, f"POST {name}",
+                                             sleep=self.deadline.sleep, statuses=POST_RETRY_STATUSES)
+            else:
+                r = send()
+            self.measure(rec, r)
+        self.last_phase = rec
+        ensure_success(r, f"POST {name}")
+        captures.ring.sample(f"POST {name}", r.text, r.status_code)
+        if self.state != "start" and is_login_page(r):
+            raise SessionExpired(f"POST {name} renvoie la page de login")
+
+        # Analysis: une seule passe (partial-response XML, sinon HTML)
+        parsed = parse_jsf_response(r.text)
+        self.last_jsf = parsed
+        self.note_viewstate(parsed.viewstate)
+        schedule_id = parsed.schedule_id
+        collected_hidden = parsed.hidden
+        new_vs = parsed.viewstate
+
+        # merge collected hidden into payload if missing
+        for k, v in collected_hidden.items():
+            if k not in payload or not payload.get(k):
+                payload[k] = v
+
+        if new_vs:
+            if new_vs != self.current_viewstate:
+                self.log(f"[viewstate] mis à jour après {name} (len={len(new_vs)})")
+            self.current_viewstate = new_vs
+            payload["javax.faces.ViewState"] = self.current_viewstate
+
+        if schedule_id:
+            self.log(f"schedule_id détecté: {schedule_id}")
+            if self.ids.resolved:
+                self.ids.set("schedule", schedule_id)
+            else:
+                # repli sans résolveur : detect old_id and replace
+                old_id = get_old_id(payload)
+                if old_id and old_id != schedule_id:
+                    self.new_id = schedule_id
+                    replace_id(payload, schedule_id, old_id)
+            payload["javax.faces.source"] = schedule_id
+            payload["javax.faces.partial.execute"] = schedule_id
+            payload["javax.faces.partial.render"] = schedule_id
+            payload[schedule_id] = schedule_id
+
+        self.settle(bool(new_vs or schedule_id), pause)
+
+        self.log(f"POST {name} done (len response={len(r.text)})")
+        return r
+
+    # ---------- étapes de navigation ----------
+    def login(self):
+        self.log("GET login page...")
+        r = self.get(LOGIN_PAGE, "get_login")
         ensure_success(r, "GET login page")
-        current_viewstate = extract_viewstate_from_html(r.text)
-        if not current_viewstate:
+        parsed = parse_jsf_response(r.text)
+        self.current_viewstate = parsed.viewstate
+        self.note_viewstate(parsed.viewstate)
+        self.ids.learn("login", r.text)
+        if not self.current_viewstate:
             raise RuntimeError("Impossible de trouver ViewState sur la page de login.")
-        print("ViewState login trouvé (len):", len(current_viewstate))
+        self.log(f"ViewState login trouvé (len): {len(self.current_viewstate)}")
 
         # récupérer action du formulaire si présent
-        soup = BeautifulSoup(r.text, "html.parser")
-        form = soup.find("form", id="formulaireSpring")
-        if form and form.get("action"):
-            login_post_url = urljoin(BASE, form["action"])
+        form_action = parsed.forms.get("formulaireSpring")
+        if form_action:
+            login_post_url = urljoin(BASE, form_action)
         else:
             login_post_url = LOGIN_PAGE
-        print("Login POST URL:", login_post_url)
+        self.log(f"Login POST URL: {login_post_url}")
 
         # POST login
         login_payload = {
-            "username": USERNAME,
-            "password": password,
+            "username": self.username,
+            "password": self.password,
             "j_idt27": "",
         }
-        r = requete_post(login_payload, "post_login", url=login_post_url, ajax=False)
+        r = self.requete_post(login_payload, "post_login", url=login_post_url, ajax=False)
 
         if ("Déconnexion" in r.text) or ("Mon compte" in r.text) or ("MainMenuPage" in r.text):
-            print("✅ Login probablement réussi (mot-clé détecté).")
+            self.log("✅ Login probablement réussi (mot-clé détecté).")
         else:
-            print("Login response ne contient pas les mots-clés attendus, GET / pour confirmer...")
-            r2 = session.get(BASE + "/")
+            self.log("Login response ne contient pas les mots-clés attendus, GET / pour confirmer...")
+            r2 = self.get(BASE + "/", "get_root")
             if "Déconnexion" in r2.text or "MainMenuPage" in r2.text:
-                print("✅ Après GET /, on est connecté.")
+                self.log("✅ Après GET /, on est connecté.")
                 r = r2
             else:
                 raise RuntimeError("❌ Login semble échouer — vérifier identifiants ou ViewState envoyé.")
+        return r
 
+    def open_main_menu(self):
         # GET MainMenuPage pour ViewState propre
-        print("GET MainMenuPage...")
-        r = session.get(MAINMENU_PAGE)
+        self.log("GET MainMenuPage...")
+        r = self.get(MAINMENU_PAGE, "get_mainmenu")
         ensure_success(r, "GET MainMenuPage")
-        vs = extract_viewstate_from_html(r.text) or extract_viewstate_from_jsf_partial(r.text)
+        vs = parse_jsf_response(r.text).viewstate
+        self.note_viewstate(vs)
+        self.ids.learn("main", r.text)
         if vs:
-            current_viewstate = vs
-            print("ViewState main trouvé (len):", len(current_viewstate))
+            self.current_viewstate = vs
+            self.log(f"ViewState main trouvé (len): {len(self.current_viewstate)}")
         else:
             raise RuntimeError("Pas de ViewState trouvé sur MainMenuPage -> abort")
+        return r
 
+    def navigate_planning(self):
         # requête 1 : ouverture sous-menu (AJAX)
         payload1 = {
             "javax.faces.partial.ajax": "true",
@@ -428,7 +703,7 @@ def main():
             "form:j_idt815_focus": "",
             "form:j_idt815_input": "45803",
         }
-        r = requete_post(payload1, "ajax_open_submenu", url=MAINMENU_PAGE, ajax=True)
+        self.requete_post(payload1, "ajax_open_submenu", url=MAINMENU_PAGE, ajax=True, idempotent=True)
 
         # navigation vers Planning
         payload2 = {
@@ -443,97 +718,693 @@ def main():
             "form:sidebar_menuid": "8_0",
         }
 
-        # tu peux ajuster si besoin : heuristique initiale pour l'id
-        new_id = "form:j_idt141"
-        r = requete_post(payload2, "navigate_planning", url=MAINMENU_PAGE, ajax=False)
-
-        print("Attente courte pour que la navigation prenne effet...")
-        time.sleep(2)
+        # tu peux ajuster si besoin : heuristique initiale pour l'id (si les ids n'ont pas pu être découverts)
+        if not self.ids.resolved:
+            self.new_id = "form:j_idt141"
+        r = self.requete_post(payload2, "navigate_planning", url=MAINMENU_PAGE, ajax=False,
+                               idempotent=True)
 
-        vs = extract_viewstate_from_html(r.text) or extract_viewstate_from_jsf_partial(r.text)
+        vs = self.last_jsf.viewstate
         if vs:
-            current_viewstate = vs
-
-        # GET Planning.xhtml pour récupérer tokens / inputs
-        print("GET Planning.xhtml pour récupérer tokens si nécessaire...")
-        r_planning = session.get(PLANNING_PAGE)
+            self.current_viewstate = vs
+        else:
+            self.log("Attente courte pour que la navigation prenne effet...")
+        self.settle(bool(vs), 2)
+        return r
+
+    def open_planning(self, required: bool = True):
+        """
+        GET Planning.xhtml pour récupérer tokens / inputs. Avec required=False (accès direct sans
+        passer par le menu), renvoie None si le serveur ne sert pas la page du planning.
+        """
+        self.log("GET Planning.xhtml pour récupérer tokens si nécessaire...")
+        r_planning = self.get(PLANNING_PAGE, "get_planning")
         ensure_success(r_planning, "GET Planning.xhtml")
-        viewstate_planning = extract_viewstate_from_html(r_planning.text) or extract_viewstate_from_jsf_partial(r_planning.text)
+        if is_login_page(r_planning):
+            raise SessionExpired("GET Planning.xhtml renvoie la page de login")
+        parsed = parse_jsf_response(r_planning.text)
+        viewstate_planning = parsed.viewstate
+        self.note_viewstate(viewstate_planning)
+        if not required and not (viewstate_planning and is_planning_page(r_planning.text)):
+            return None
+        found = self.ids.learn("planning", r_planning.text)
+        if found.get("schedule"):
+            self.log(f"id du schedule découvert : {found['schedule']}")
         if not viewstate_planning:
             raise RuntimeError("Impossible de récupérer ViewState sur Planning.xhtml -> abort")
-        current_viewstate = viewstate_planning
-        print("ViewState planning (len):", len(current_viewstate))
-
-        soup = BeautifulSoup(r_planning.text, "html.parser")
-        def get_input_value(soup, name, default=None):
-            el = soup.find("input", {"name": name})
-            if not el:
-                return default
-            return el.get("value", default)
-
-        largeur = get_input_value(soup, "form:largeurDivCenter", "907")
-        id_init_val = get_input_value(soup, "form:idInit", "webscolaapp.Planning_-1425867247129692267")
-        print("idInit:", id_init_val)
-
-        # Fonction pour télécharger et générer ICS
-        def dl_ics(date, week):
-            # payload de téléchargement (tu peux ajuster timestamps si besoin)
-            payload3 = {
-                "javax.faces.partial.ajax": "true",
-                "javax.faces.source": "form:j_idt118",
-                "javax.faces.partial.execute": "form:j_idt118",
-                "javax.faces.partial.render": "form:j_idt118",
-                "form:j_idt118": "form:j_idt118",
-                "form:j_idt118_start": "1757887200000",
-                "form:j_idt118_end": "1775944800000",
-                "form": "form",
-                "form:largeurDivCenter": largeur,
-                "form:idInit": id_init_val,
-                "form:date_input": date,
-                "form:week": week,
-                "form:j_idt118_view": "agendaWeek",
-                "form:offsetFuseauNavigateur": "-7200000",
-                "form:onglets_activeIndex": "0",
-                "form:onglets_scrollState": "0",
-            }
-            r = requete_post(payload3, "download_ics", url=PLANNING_PAGE, ajax=False, pause=1.0)
-
-            payload4 = {
-                "javax.faces.partial.ajax": "true",
-                "javax.faces.source": "form:j_idt118",
-                "javax.faces.partial.execute": "form:j_idt118",
-                "javax.faces.partial.render": "form:j_idt118",
-                "form:j_idt118": "form:j_idt118",
-                "form:j_idt118_start": "1757677600000",
-                "form:j_idt118_end": "1775944800000",
-                "form": "form",
-                "form:largeurDivCenter": "1550",
-                "form:idInit": "webscolaapp.Planning_-3130307915882446410",
-                "form:date_input": date,
-                "form:week": week,
-                "form:j_idt118_view": "agendaWeek",
-                "form:offsetFuseauNavigateur": "-7200000",
-                "form:onglets_activeIndex": "0",
-                "form:onglets_scrollState": "0",
-            }
-            r = requete_post(payload4, "final_ics_download", url=PLANNING_PAGE, ajax=False, pause=1.0)
-
-            content = r.text
-            # debug dump
-            print("---------- server response start ----------")
+        self.current_viewstate = viewstate_planning
+        self.log(f"ViewState planning (len): {len(self.current_viewstate)}")
+
+        self.largeur = parsed.input_value("form:largeurDivCenter", "907")
+        self.id_init_val = parsed.input_value("form:idInit", "webscolaapp.Planning_-1425867247129692267")
+        self.log(f"idInit: {self.id_init_val}")
+        return r_planning
+
+    def reach_planning(self):
+        """MainMenuPage -> Planning : GET direct d'abord, détour sous-menu seulement si le serveur l'exige."""
+        if not self.detour:
+            if self.open_planning(required=False):
+                self.detour = False
+                return
+            self.log("Planning pas accessible directement -> détour par le sous-menu")
+            self.detour = True
+        self.navigate_planning()
+        self.open_planning()
+
+    def dl_ics(self, date, week):
+        """Télécharge le planning de la semaine demandée et écrit self.output atomiquement."""
+        # payload de téléchargement (tu peux ajuster timestamps si besoin)
+        payload3 = {
+            "javax.faces.partial.ajax": "true",
+            "javax.faces.source": "form:j_idt118",
+            "javax.faces.partial.execute": "form:j_idt118",
+            "javax.faces.partial.render": "form:j_idt118",
+            "form:j_idt118": "form:j_idt118",
+            "form:j_idt118_start": "1757887200000",
+            "form:j_idt118_end": "1775944800000",
+            "form": "form",
+            "form:largeurDivCenter": self.largeur,
+            "form:idInit": self.id_init_val,
+            "form:date_input": date,
+            "form:week": week,
+            "form:j_idt118_view": "agendaWeek",
+            "form:offsetFuseauNavigateur": "-7200000",
+            "form:onglets_activeIndex": "0",
+            "form:onglets_scrollState": "0",
+        }
+        r = self.requete_post(payload3, "download_ics", url=PLANNING_PAGE, ajax=False, pause=1.0,
+                              idempotent=True)
+
+        payload4 = {
+            "javax.faces.partial.ajax": "true",
+            "javax.faces.source": "form:j_idt118",
+            "javax.faces.partial.execute": "form:j_idt118",
+            "javax.faces.partial.render": "form:j_idt118",
+            "form:j_idt118": "form:j_idt118",
+            "form:j_idt118_start": "1757677600000",
+            "form:j_idt118_end": "1775944800000",
+            "form": "form",
+            "form:largeurDivCenter": "1550",
+            "form:idInit": "webscolaapp.Planning_-3130307915882446410",
+            "form:date_input": date,
+            "form:week": week,
+            "form:j_idt118_view": "agendaWeek",
+            "form:offsetFuseauNavigateur": "-7200000",
+            "form:onglets_activeIndex": "0",
+            "form:onglets_scrollState": "0",
+        }
+        r = self.requete_post(payload4, "final_ics_download", url=PLANNING_PAGE, ajax=False, pause=1.0,
+                              idempotent=True)
+
+        content = r.text
+        # debug dump
+        if DEBUG:
+            self.log("---------- server response start ----------")
             print(content[:2000])
-            print("---------- server response end ----------")
+            self.log("---------- server response end ----------")
+
+        # tenter de générer ICS puis écrire atomiquement
+        self.write_output(iter_events(content))
 
-            # tenter de générer ICS puis écrire atomiquement
-            ics_text = generate_ics_from_partial_response(content)
-            write_ics_safely(ics_text, final_path="planning.ics")
+    # ---------- mode plage ----------
+    def schedule_payload(self, a: date_cls, b: date_cls, view: str = "agendaWeek") -> dict:
+        """Requête de chargement du schedule pour la fenêtre [a, b[ (même forme que payload3)."""
+        w = window_params(a, b)
+        payload = {
+            "javax.faces.partial.ajax": "true",
+            "javax.faces.source": "form:j_idt118",
+            "javax.faces.partial.execute": "form:j_idt118",
+            "javax.faces.partial.render": "form:j_idt118",
+            "form:j_idt118": "form:j_idt118",
+            "form:j_idt118_start": w["start"],
+            "form:j_idt118_end": w["end"],
+            "form": "form",
+            "form:largeurDivCenter": self.largeur,
+            "form:idInit": self.id_init_val,
+            "form:date_input": w["date_input"],
+            "form:week": w["week"],
+            "form:j_idt118_view": view,
+            "form:offsetFuseauNavigateur": w["offset"],
+            "form:onglets_activeIndex": "0",
+            "form:onglets_scrollState": "0",
+        }
+        self.ids.rewrite(payload)
+        if self.new_id is not None and not self.ids.resolved:
+            old_id = get_old_id(payload)
+            if old_id and old_id != self.new_id:
+                replace_id(payload, self.new_id, old_id)
+        if self.current_viewstate:
+            payload["javax.faces.ViewState"] = self.current_viewstate
+        return payload
+
+    def fetch_window(self, a: date_cls, b: date_cls, view: str = "agendaWeek") -> list:
+        """
+        Télécharge une fenêtre sur la session déjà authentifiée, sans toucher à l'état partagé
+        (appelable depuis plusieurs threads). Seule cette fenêtre est réessayée en cas d'échec.
+        """
+        import requests
+        from transport import backoff_delay
+        label = f"{a:%d/%m/%Y}-{b:%d/%m/%Y}"
+        with self.metrics.phase("range_window", "POST", detail=label) as rec:
+            for attempt in range(1, WINDOW_RETRIES + 2):
+                rec["retries"] = attempt - 1
+                try:
+                    self.throttle()
+                    r = self.session.post(PLANNING_PAGE, data=self.schedule_payload(a, b, view),
+                                          headers=post_headers(PLANNING_PAGE, False),
+                                          timeout=self.deadline.timeout(HTTP_TIMEOUT))
+                    self.measure(rec, r)
+                    ensure_success(r, f"POST window {label}")
+                    events = [normalize_event(ev) for ev in iter_raw_events(r.text)]
+                    rec["events"] = len(events)
+                    self.log(f"fenêtre {label} : {len(events)} événements")
+                    return events
+                except (requests.RequestException, RuntimeError, ValueError) as e:
+                    if attempt > WINDOW_RETRIES:
+                        raise RuntimeError(f"fenêtre {label} en échec après {attempt} essais : {e}")
+                    self.log(f"fenêtre {label} : essai {attempt} échoué ({e}), nouvel essai")
+                    self.deadline.sleep(backoff_delay(attempt, HTTP_BACKOFF))
+
+    def dl_range(self, start: date_cls, end: date_cls, unit: str = DEFAULT_WINDOW, workers: int = WINDOW_WORKERS):
+        """
+        Mode plage : découpe [start, end] en fenêtres, les télécharge en parallèle sur la même
+        session, fusionne les événements (dédoublonnés par UID) et écrit self.output.
+        """
+        windows = split_windows(start, end, unit)
+        view = "month" if unit == "month" else "agendaWeek"
+        self.log(f"plage {start:%d/%m/%Y} -> {end:%d/%m/%Y} : {len(windows)} fenêtres ({unit})")
+
+        store = self.open_store()
+        todo = windows
+        if store is not None and not self.full_sync:
+            todo = store.due_windows(windows)
+            self.log(f"base locale : {len(todo)}/{len(windows)} fenêtres à rafraîchir")
+
+        fetched = []        # (début, fin, événements) par fenêtre téléchargée
+        if todo:
+            # amorce séquentielle : cale ViewState et id du schedule, et sert de première fenêtre
+            r = self.requete_post(self.schedule_payload(*todo[0], view), "range_prime", url=PLANNING_PAGE,
+                                  ajax=False, idempotent=True)
+            try:
+                fetched.append((*todo[0], [normalize_event(ev) for ev in iter_raw_events(r.text)]))
+                pending = todo[1:]
+            except ValueError:
+                pending = todo
+
+            if pending:
+                with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+                    futures = {pool.submit(self.fetch_window, a, b, view): (a, b) for a, b in pending}
+                    try:
+                        for fut in as_completed(futures):
+                            fetched.append((*futures[fut], fut.result()))
+                    except Exception:
+                        for f in futures:
+                            f.cancel()
+                        raise
+
+        if store is not None:
+            added = changed = removed = 0
+            for a, b, evs in sorted(fetched, key=lambda w: w[0]):
+                n_add, n_mod, n_del = store.sync_window(a, b, evs)
+                added, changed, removed = added + n_add, changed + n_mod, removed + n_del
+            self.log(f"base locale : +{added} ~{changed} -{removed} sur {len(fetched)} fenêtres téléchargées")
+            # l'ICS vient de la base (requête indexée sur la plage), pas seulement de ce run
+            self.write_output(store.iter_range(windows[0][0], windows[-1][1]))
+            return
+
+        merged = {}
+        for _, _, evs in fetched:
+            for ev in evs:
+                merged[ev.uid] = ev
+        events = sorted(merged.values(), key=lambda ev: (ev.start, ev.uid))
+        self.log(f"{len(events)} événements uniques sur {len(windows)} fenêtres")
+        self.write_output(iter(events))
+
+    def open_store(self):
+        if self.store is None and self.store_path:
+            from event_store import EventStore
+            os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+            self.store = EventStore(self.store_path)
+        return self.store
+
+    # ---------- cache de session ----------
+    def save_session(self):
+        """Sauvegarde cookies, ViewState et id JSF découvert dans self.cache_path (0600)."""
+        if not self.cache_path:
+            return
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in self.session.cookies
+        ]
+        write_private_json(self.cache_path, {
+            "username": self.username,
+            "saved_at": time.time(),
+            "cookies": cookies,
+            "viewstate": self.current_viewstate,
+            "new_id": self.new_id,
+            "state": self.state,
+            "detour": self.detour,
+            "largeur": self.largeur,
+            "id_init": self.id_init_val,
+            "roles": self.ids.roles,
+        })
+        self.debug(f"session sauvegardée dans {self.cache_path} (état {self.state})")
+
+    def restore_session(self) -> bool:
+        """Recharge la session en cache si elle existe, appartient à ce compte et n'est pas trop vieille."""
+        if not self.cache_path:
+            return False
+        data = read_private_json(self.cache_path)
+        if not data or data.get("username") != self.username:
+            return False
+        age = time.time() - data.get("saved_at", 0)
+        if age > SESSION_CACHE_MAX_AGE:
+            self.log(f"cache de session trop ancien ({int(age)} s) -> login complet")
+            return False
+        for c in data.get("cookies", []):
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path"))
+        self.current_viewstate = data.get("viewstate")
+        self.new_id = data.get("new_id")
+        self.state = data.get("state") or "session"
+        self.detour = data.get("detour")
+        self.largeur = data.get("largeur") or self.largeur
+        self.id_init_val = data.get("id_init")
+        for role, real_id in (data.get("roles") or {}).items():
+            self.ids.set(role, real_id)
+        return True
+
+    def probe_session(self):
+        """
+        Sonde peu coûteuse : GET MainMenuPage avec les cookies en cache. Si la session est
+        toujours valide, la réponse sert directement d'étape open_main_menu ; sinon None.
+        """
+        self.log("GET MainMenuPage (sonde session en cache)...")
+        r = self.get(MAINMENU_PAGE, "probe_session")
+        if r.status_code >= 400 or is_login_page(r):
+            self.log("session en cache expirée -> login complet")
+            return None
+        vs = parse_jsf_response(r.text).viewstate
+        if not vs:
+            return None
+        self.note_viewstate(vs)
+        self.ids.learn("main", r.text)
+        self.current_viewstate = vs
+        self.log(f"✅ session en cache valide, ViewState main (len): {len(vs)}")
+        return r
+
+    def run(self, date="15/09/2025", week="38-2025", date_range=None, window=DEFAULT_WINDOW):
+        """
+        Flow complet pour ce compte : login → MainMenuPage → Planning → dl_ics.
+        Avec date_range=(début, fin), dl_range remplace dl_ics.
+        """
+        t0 = time.monotonic()
+        self.deadline = Deadline(self.deadline_s, self.deadline_at)
+        error = None
+        try:
+            self._run(date, week, date_range, window)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            total = time.monotonic() - t0
+            self.metrics.finish(error is None, total, self.wait_time, changed=self.changed, error=error)
+            self.log(f"temps total {total:.2f} s : attente {self.wait_time:.2f} s, travail {total - self.wait_time:.2f} s")
+            wire, decoded = self.metrics.transfer()
+            if wire < decoded:
+                self.log(f"compression : {wire} o reçus pour {decoded} o décodés ({decoded - wire} o économisés)")
+            self.debug("détail par étape :\n" + self.metrics.summary())
+
+    # ---------- machine à états ----------
+    # start    : pas de session -> login + MainMenuPage                               -> menu
+    # session  : cookies en mémoire / en cache -> GET Planning direct                 -> planning | menu | start
+    # menu     : ViewState MainMenuPage -> GET Planning direct, sinon détour sous-menu -> planning
+    # planning : ViewState Planning -> téléchargement                                 -> done
+    # Chaque état atteint est checkpointé (cookies, ViewState...) ; un échec reprend depuis
+    # l'état précédent (RESUME_FROM), une page de login renvoie à start. Un login en échec
+    # n'est pas rejoué (identifiants faux : inutile d'insister sur le compte).
+    RESUME_FROM = {"planning": "menu", "menu": "start", "session": "start", "start": None}
+    # phase du budget de temps (deadline.PHASES) consommée par chaque état
+    PHASE_OF = {"start": "login", "session": "navigation", "menu": "navigation", "planning": "download"}
+
+    def step(self, state: str, date, week, date_range, window) -> str:
+        if state == "start":
+            # repart d'une session vierge pour ne pas mélanger cookies expirés et nouveaux
+            self.state = "start"
+            self.session.cookies.clear()
+            self.current_viewstate = None
+            self.new_id = None
+            self.login()
+            self.open_main_menu()
+            return "menu"
+        if state == "session":
+            if not self.detour and self.open_planning(required=False):
+                return "planning"
+            return "menu" if self.probe_session() else "start"
+        if state == "menu":
+            self.reach_planning()
+            return "planning"
+        if state == "planning":
+            if date_range:
+                self.dl_range(date_range[0], date_range[1], window)
+            else:
+                self.dl_ics(date, week)
+            return "done"
+        raise ValueError(f"état inconnu : {state}")
+
+    def checkpoint(self, state: str):
+        # une fois le téléchargement fait, on reste sur la vue Planning : c'est le point de reprise
+        self.state = "planning" if state == "done" else state
+        self.save_session()
+
+    def _run(self, date, week, date_range, window):
+        # session encore ouverte (mode serveur) ou en cache : reprise depuis le dernier état
+        if self.session.cookies or self.restore_session():
+            state = "planning" if self.state == "planning" else "session"
+        else:
+            state = "start"
+        failures = 0
+        logged_in = False
+        while state != "done":
+            try:
+                with self.deadline.phase(self.PHASE_OF[state]):
+                    try:
+                        nxt = self.step(state, date, week, date_range, window)
+                    except Exception as e:
+                        # timeout réseau (ou autre) alors que la phase n'a plus de temps : c'est l'échéance
+                        if not isinstance(e, DeadlineExceeded) and self.deadline.remaining() <= 0:
+                            raise self.deadline.exceeded(str(e)) from e
+                        raise
+            except DeadlineExceeded:
+                # plus de temps pour une reprise : on abandonne, l'ancien planning reste en place
+                raise
+            except Exception as e:
+                if isinstance(e, SessionExpired) and not logged_in and state != "start":
+                    # session héritée (mémoire / cache) expirée : cas normal, pas un échec
+                    self.log(f"session expirée ({e}) -> login complet")
+                    state = "start"
+                    continue
+                failures += 1
+                back = self.RESUME_FROM[state]
+                if back and isinstance(e, SessionExpired):
+                    back = "start"
+                if back is None or failures > RESUME_ATTEMPTS:
+                    self.state = "start"
+                    raise
+                self.log(f"étape {state} en échec ({e}) -> reprise depuis {back} ({failures}/{RESUME_ATTEMPTS})")
+                state = back
+                continue
+            logged_in = logged_in or state == "start"
+            self.debug(f"état {state} -> {nxt}")
+            self.checkpoint(nxt)
+            state = nxt
+        self.log("Fini.")
+
+# ---------- Mode multi-comptes ----------
+def load_accounts(path: str) -> list:
+    """
+    Lit la liste des comptes depuis un fichier JSON :
+      [{"username": "...", "password_env": "PASS_XXX", "output": "planning_xxx.ics"}, ...]
+    "password" peut être donné en clair à la place de "password_env" (déconseillé).
+    "output" vaut planning_<username>.ics par défaut.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    accounts = []
+    for entry in raw:
+        username = entry["username"]
+        password = entry.get("password")
+        if not password and entry.get("password_env"):
+            password = os.environ.get(entry["password_env"])
+        if not password:
+            raise ValueError(f"Pas de mot de passe pour le compte {username} (password / password_env)")
+        output = entry.get("output") or f"planning_{username}.ics"
+        accounts.append({"username": username, "password": password, "output": output})
+    return accounts
+
+def fetch_account(account: dict, cache_dir: Optional[str] = None, run_kwargs: Optional[dict] = None,
+                  runs: Optional[list] = None, client_kwargs: Optional[dict] = None):
+    client = OnboardClient(account["username"], account["password"], output=account["output"], cache_dir=cache_dir,
+                           **(client_kwargs or {}))
+    if runs is not None:
+        runs.append(client.metrics)
+    client.run(**(run_kwargs or {}))
+    return client
+
+def fetch_accounts(accounts: list, concurrency: int = DEFAULT_CONCURRENCY, cache_dir: Optional[str] = None,
+                   changed: Optional[set] = None, run_kwargs: Optional[dict] = None, runs: Optional[list] = None,
+                   client_kwargs: Optional[dict] = None) -> dict:
+    """
+    Lance le flow pour chaque compte dans un pool de threads borné (concurrency).
+    Chaque compte a sa propre session et son propre fichier de sortie ; l'échec d'un
+    compte n'interrompt pas les autres. Renvoie {username: None | message d'erreur}
+    et remplit `changed` avec les comptes dont le planning a été réécrit, `runs` avec
+    les mesures de chaque compte.
+    """
+    results = {}
+    workers = max(1, min(concurrency, len(accounts)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_account, acc, cache_dir, run_kwargs, runs, client_kwargs): acc["username"] for acc in accounts}
+        for fut in as_completed(futures):
+            username = futures[fut]
+            try:
+                client = fut.result()
+                if client.changed:
+                    print(f"[{username}] ✅ {client.output} écrit.")
+                    if changed is not None:
+                        changed.add(username)
+                else:
+                    print(f"[{username}] = {client.output} inchangé.")
+                results[username] = None
+            except Exception as e:
+                print(f"[{username}] [ERROR] get ICS failed : {e}")
+                results[username] = str(e)
+    return results
+
+def output_paths(output: str, username: str, feeds_config: Optional[str] = None) -> list:
+    """Fichiers produits pour un compte : planning complet puis flux filtrés."""
+    if not feeds_config:
+        return [output]
+    from feeds import load_feeds
+    return [output] + [feed.output for feed in load_feeds(feeds_config, output, username)]
+
+def publish_outputs(paths: list, publish_dir: str) -> bool:
+    from publish import publish
+    changed = publish(paths, publish_dir)
+    print(f"{publish_dir} : {'artefacts mis à jour' if changed else 'rien à republier'}")
+    return changed
+
+# ---------- Mode serveur ----------
+def refresh_feeds(clients: list, store: "FeedStore", concurrency: int, run_kwargs: dict, metrics_dir=None):
+    """Un cycle : rafraîchit chaque compte puis publie son ICS ; en cas d'échec l'ancien reste servi."""
+    for client in clients:
+        client.metrics = metrics.RunMetrics(client.username)
+    workers = max(1, min(concurrency, len(clients)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(client.run, **run_kwargs): client for client in clients}
+        for fut in as_completed(futures):
+            client = futures[fut]
+            name = os.path.basename(client.output)
+            try:
+                fut.result()
+            except Exception as e:
+                client.log(f"[ERROR] rafraîchissement échoué, on continue de servir l'ancien planning : {e}")
+                continue
+            if (client.changed or store.get(name) is None) and store.publish_file(name, client.output):
+                client.log(f"flux /{name} mis à jour")
+            for path in client.outputs()[1:]:
+                name = os.path.basename(path)
+                if (path in client.feeds_changed or store.get(name) is None) and os.path.exists(path) \
+                        and store.publish_file(name, path):
+                    client.log(f"flux /{name} mis à jour")
+    if metrics_dir:
+        metrics.export(metrics_dir, [c.metrics for c in clients])
+
+def serve(clients: list, host: str, port: int, interval: float = SERVE_INTERVAL, jitter: float = SERVE_JITTER,
+          concurrency: int = DEFAULT_CONCURRENCY, run_kwargs: Optional[dict] = None, metrics_dir=None,
+          stop: Optional[threading.Event] = None):
+    """
+    Garde les sessions ouvertes et rafraîchit les plannings toutes les `interval` ± `jitter`
+    secondes, pendant qu'un serveur HTTP sert le dernier ICS valide depuis la mémoire.
+    """
+    from feed_server import FeedStore, start_feed_server
+    store = FeedStore()
+    for client in clients:
+        # les derniers fichiers écrits sont servis tout de suite, avant même le premier login
+        for path in client.outputs():
+            if os.path.exists(path):
+                store.publish_file(os.path.basename(path), path)
+    server = start_feed_server(store, host, port)
+    print(f"flux ICS servis sur http://{host}:{server.server_address[1]}/ : "
+          + ", ".join(os.path.basename(p) for c in clients for p in c.outputs()))
+    stop = stop or threading.Event()
+    try:
+        while not stop.is_set():
+            refresh_feeds(clients, store, concurrency, run_kwargs or {}, metrics_dir)
+            delay = max(1.0, interval + random.uniform(-jitter, jitter))
+            print(f"prochain rafraîchissement dans {delay:.0f} s")
+            stop.wait(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return store
 
-        # Les paramètres que tu utilises (ajuste si besoin)
-        date1 = "15/09/2025"
-        week1 = "38-2025"
-        dl_ics(date1, week1)
+def parse_listen(value: str):
+    """'8080', ':8080' ou 'hôte:8080' -> (hôte, port) ; écoute en local par défaut."""
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
 
-        print("Fini.")
+# ---------- Script principal ----------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export du planning OnBoard en ICS")
+    parser.add_argument("--accounts", default=os.environ.get("ONBOARD_ACCOUNTS"),
+                        help="fichier JSON listant les comptes à exporter en parallèle (env ONBOARD_ACCOUNTS)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="nombre max de comptes traités en même temps (env ONBOARD_CONCURRENCY)")
+    parser.add_argument("--session-cache", default=os.environ.get("ONBOARD_SESSION_CACHE"),
+                        help="dossier où garder les sessions entre deux runs pour sauter le login (env ONBOARD_SESSION_CACHE)")
+    parser.add_argument("--range", nargs=2, metavar=("DEBUT", "FIN"),
+                        help="télécharge toute la plage (JJ/MM/AAAA ou AAAA-MM-JJ) par fenêtres en parallèle")
+    parser.add_argument("--window", choices=("week", "month"), default=DEFAULT_WINDOW,
+                        help="découpage de la plage (env ONBOARD_WINDOW)")
+    parser.add_argument("--metrics-dir", default=os.environ.get("ONBOARD_METRICS_DIR"),
+                        help="écrit run_report.json et onboard.prom (textfile Prometheus) dans ce dossier")
+    parser.add_argument("--debug", action="store_true", default=DEBUG,
+                        help="affiche les clés de payload, le début des réponses et le détail par étape")
+    parser.add_argument("--serve", metavar="[HOTE:]PORT", default=os.environ.get("ONBOARD_SERVE"),
+                        help="reste actif : rafraîchit périodiquement et sert les ICS en HTTP (ETag, 304)")
+    parser.add_argument("--interval", type=float, default=SERVE_INTERVAL,
+                        help="secondes entre deux rafraîchissements en mode serveur (env ONBOARD_INTERVAL)")
+    parser.add_argument("--jitter", type=float, default=SERVE_JITTER,
+                        help="gigue aléatoire ± en secondes ajoutée à l'intervalle (env ONBOARD_JITTER)")
+    parser.add_argument("--store", default=os.environ.get("ONBOARD_STORE"),
+                        help="dossier de la base SQLite des événements (mode plage) : seules les fenêtres "
+                             "susceptibles d'avoir changé sont retéléchargées (env ONBOARD_STORE)")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="avec --store : retélécharge toutes les fenêtres de la plage")
+    parser.add_argument("--feeds", default=os.environ.get("ONBOARD_FEEDS"),
+                        help="fichier JSON de flux filtrés (cours, type, salle, enseignant) écrits en plus du "
+                             "planning complet, à partir du même téléchargement (env ONBOARD_FEEDS)")
+    parser.add_argument("--publish-dir", default=os.environ.get("ONBOARD_PUBLISH_DIR"),
+                        help="dossier de publication : ICS stable, .ics.gz / .ics.br, copie immuable nommée "
+                             "par hash et manifest.json ; seuls les artefacts modifiés sont réécrits "
+                             "(env ONBOARD_PUBLISH_DIR)")
+    parser.add_argument("--deadline", type=float, default=RUN_DEADLINE,
+                        help="budget de temps du run en secondes, réparti entre login, navigation, "
+                             "téléchargement et écriture ; 0 = illimité (env ONBOARD_DEADLINE)")
+    parser.add_argument("--lock", default=LOCK_PATH,
+                        help="fichier de verrou : un run refuse de démarrer si un autre est actif "
+                             "(env ONBOARD_LOCK)")
+    parser.add_argument("--no-lock", action="store_true", help="ne prend pas le verrou")
+    parser.add_argument("--capture-dir", default=CAPTURE_DIR,
+                        help="dossier des captures de debug gzip, masquées (env ONBOARD_CAPTURE_DIR)")
+    parser.add_argument("--capture-max-files", type=int, default=CAPTURE_MAX_FILES,
+                        help="nombre max de captures gardées, les plus anciennes sont supprimées "
+                             "(env ONBOARD_CAPTURE_MAX_FILES)")
+    parser.add_argument("--capture-max-mb", type=float, default=CAPTURE_MAX_MB,
+                        help="taille totale max des captures en Mo (env ONBOARD_CAPTURE_MAX_MB)")
+    parser.add_argument("--capture-sample", type=float, default=CAPTURE_SAMPLE,
+                        help="proportion (0-1) des réponses réussies capturées, pour suivre les tailles "
+                             "de payload (env ONBOARD_CAPTURE_SAMPLE)")
+    args = parser.parse_args(argv)
+    set_debug(args.debug)
+    captures.configure(args.capture_dir, args.capture_max_files, int(args.capture_max_mb * 2 ** 20),
+                       args.capture_sample)
+    runs = []
+    lock = None
+    if not args.serve and not args.no_lock and args.lock:
+        from runlock import RunLock, LockHeld
+        # un run bloqué au-delà de son échéance (+ marge) ne doit plus empêcher les suivants
+        stale = LOCK_STALE or ((args.deadline + 60) if args.deadline else None)
+        lock = RunLock(args.lock, stale)
+        try:
+            lock.acquire()
+        except LockHeld as e:
+            print(f"Erreur: {e}")
+            return EXIT_LOCKED
+    try:
+        return _main(args, runs)
+    finally:
+        if lock is not None:
+            lock.release()
+        captures.ring.flush()
+        if args.metrics_dir and runs:
+            metrics.export(args.metrics_dir, runs)
+            print(f"métriques écrites dans {args.metrics_dir}")
+
+def set_debug(enabled: bool):
+    global DEBUG
+    DEBUG = enabled
+
+def _main(args, runs: list):
+
+    if args.feeds:
+        # config invalide : erreur tout de suite plutôt qu'après le login de chaque compte
+        from feeds import load_feeds
+        print(f"{len(load_feeds(args.feeds))} flux filtrés définis dans {args.feeds}")
+    deadline = args.deadline or None
+    client_kwargs = {"store_dir": args.store, "full_sync": args.full_sync, "feeds_config": args.feeds,
+                     "deadline": deadline,
+                     # hors mode serveur, l'échéance vaut pour tout le process (comptes en attente compris)
+                     "deadline_at": time.monotonic() + deadline if deadline and not args.serve else None}
+    run_kwargs = {}
+    if args.range:
+        run_kwargs = {"date_range": (parse_date(args.range[0]), parse_date(args.range[1])), "window": args.window}
+
+    if args.serve:
+        if args.accounts:
+            clients = [OnboardClient(a["username"], a["password"], output=a["output"], cache_dir=args.session_cache,
+                                     **client_kwargs)
+                       for a in load_accounts(args.accounts)]
+        else:
+            password = os.environ.get("ONBOARD_PASS")
+            if not password:
+                print("Erreur: la variable d'environnement ONBOARD_PASS n'est pas définie.")
+                return 1
+            clients = [OnboardClient(USERNAME, password, output="planning.ics", cache_dir=args.session_cache,
+                                     **client_kwargs)]
+        host, port = parse_listen(args.serve)
+        serve(clients, host, port, args.interval, args.jitter, args.concurrency, run_kwargs, args.metrics_dir)
+        return 0
+
+    if args.accounts:
+        accounts = load_accounts(args.accounts)
+        print(f"{len(accounts)} comptes, concurrence max {args.concurrency}")
+        changed = set()
+        results = fetch_accounts(accounts, args.concurrency, cache_dir=args.session_cache, changed=changed,
+                                 run_kwargs=run_kwargs, runs=runs, client_kwargs=client_kwargs)
+        failed = [u for u, err in results.items() if err]
+        print(f"Fini : {len(results) - len(failed)} ok ({len(changed)} modifiés), {len(failed)} en échec.")
+        published = False
+        if args.publish_dir:
+            # comptes en échec : leur dernier planning valide reste publié
+            published = publish_outputs([p for a in accounts for p in output_paths(a["output"], a["username"], args.feeds)],
+                                        args.publish_dir)
+        if failed:
+            return 1
+        # un artefact nouveau (manifest, .gz, copie immuable) doit être déployé même si l'ICS est inchangé
+        return 0 if changed or published else EXIT_UNCHANGED
+
+    # récupère mot de passe et user
+    password = os.environ.get("ONBOARD_PASS")
+    if not password:
+        # Ne pas écraser l'ancien planning si ONBOARD_PASS manquant
+        print("Erreur: la variable d'environnement ONBOARD_PASS n'est pas définie. Ajouter dans Settings → Secrets.")
+        # Le script termine normalement sans remplacer l'ICS.
+        return 0
+
+    client = OnboardClient(USERNAME, password, output="planning.ics", cache_dir=args.session_cache, **client_kwargs)
+    runs.append(client.metrics)
+    try:
+        client.run(**run_kwargs)
+    except DeadlineExceeded as e:
+        print(f"[ERROR] {e} -> run annulé, {client.output} laissé tel quel")
+        return 1
+    published = False
+    if args.publish_dir:
+        published = publish_outputs(client.outputs(), args.publish_dir)
+    return 0 if client.changed or published else EXIT_UNCHANGED
     """except Exception as e:
         # En cas d'erreur, on logge et on ne remplace PAS l'ancien planning.ics
         print(f"[ERROR] get ICS failed : {e}")
@@ -546,4 +1417,4 @@ def main():
         return"""
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# ics_digest.py — détection de changement du planning : hash canonique par événement
+# (clé UID) + digest global, stockés à côté du fichier ICS pour le run suivant.
+
+import json
+import hashlib
+from typing import Optional
+
+from atomicfile import write_atomic
+from ics_stream import ICS_FORMAT
+
+
+def digest_path(ics_path: str) -> str:
+    return ics_path + ".digest.json"
+
+
+def event_hash(ev) -> str:
+    """Hash canonique d'un événement normalisé (ics_stream.Event) : début, fin, intitulé complet."""
+    canon = "\x1f".join((ev.start, ev.end, ev.title))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()[:16]
+
+
+class CalendarDigest:
+    """
+    Empreintes des événements d'un calendrier : {uid: (hash, libellé court)}.
+    track() s'insère dans le flux d'événements sans le matérialiser.
+    """
+
+    def __init__(self, events: Optional[dict] = None, fmt: int = ICS_FORMAT):
+        self.events = events if events is not None else {}
+        # version du rendu ICS qui a produit le fichier : un autre format impose la réécriture
+        self.format = fmt
+
+    def track(self, events):
+        for ev in events:
+            self.events[ev.uid] = (event_hash(ev), f"{ev.start} {ev.summary}")
+            yield ev
+
+    @property
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        for uid in sorted(self.events):
+            h.update(f"{uid}\x1f{self.events[uid][0]}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def diff(self, previous: "CalendarDigest"):
+        """Renvoie (ajoutés, supprimés, modifiés) : listes de (uid, libellé)."""
+        old, new = previous.events, self.events
+        added = [(uid, new[uid][1]) for uid in new if uid not in old]
+        removed = [(uid, old[uid][1]) for uid in old if uid not in new]
+        modified = [(uid, f"{old[uid][1]} -> {new[uid][1]}") for uid in new
+                    if uid in old and old[uid][0] != new[uid][0]]
+        return sorted(added), sorted(removed), sorted(modified)
+
+    def save(self, path: str):
+        data = {"digest": self.digest, "format": self.format, "events": {uid: list(v) for uid, v in self.events.items()}}
+        write_atomic(path, json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CalendarDigest"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls({uid: tuple(v) for uid, v in data["events"].items()}, data.get("format", 1))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+def format_diff(added, removed, modified, limit: int = 10) -> str:
+    """Diff compact : une ligne de synthèse puis au plus `limit` lignes par catégorie."""
+    out = [f"planning modifié : +{len(added)} -{len(removed)} ~{len(modified)}"]
+    for sign, items in (("+", added), ("-", removed), ("~", modified)):
+        for uid, label in items[:limit]:
+            out.append(f"  {sign} {uid.split('@')[0]} {label}")
+        if len(items) > limit:
+            out.append(f"  {sign} ... et {len(items) - limit} autres")
+    return "\n".join(out)
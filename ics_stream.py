@@ -0,0 +1,327 @@
+# ics_stream.py — extraction des événements et écriture ICS en streaming :
+# les événements sont décodés un par un depuis la réponse et écrits directement
+# dans le fichier, sans liste complète ni gros texte ICS intermédiaire.
+# Les intitulés OnBoard ("PROD - C008 - ESLAMI - TD -") sont découpés en champs typés
+# dans des Event à __slots__, avec les valeurs très répétées internées.
+
+import re
+import sys
+import json
+from datetime import datetime
+
+_WS_RE = re.compile(r'\s*')
+_EMPTY_EVENTS_RE = re.compile(r'"events"\s*:\s*\[\s*\]')
+_decoder = json.JSONDecoder()
+_ISO_LOCAL_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:[+-]\d{2}:?\d{2}|Z)\Z')
+
+ICS_HEADER = (
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Onboard//Planning//FR",
+    "CALSCALE:GREGORIAN",
+)
+ICS_FOOTER = ("END:VCALENDAR",)
+# version du rendu des VEVENT : entre dans le digest, un changement de format force la réécriture
+ICS_FORMAT = 2
+
+
+def _skip_ws(s: str, i: int) -> int:
+    return _WS_RE.match(s, i).end()
+
+
+def _iter_array(s: str, i: int):
+    """s[i] == '[' : décode et renvoie les éléments du tableau un par un (raw_decode)."""
+    i = _skip_ws(s, i + 1)
+    if s[i:i + 1] == "]":
+        return
+    while True:
+        obj, i = _decoder.raw_decode(s, i)
+        yield obj
+        i = _skip_ws(s, i)
+        c = s[i:i + 1]
+        if c == ",":
+            i = _skip_ws(s, i + 1)
+        elif c == "]":
+            return
+        else:
+            raise ValueError(f"JSON des événements tronqué ou invalide (offset {i}).")
+
+
+def _find_events_key(s: str, i: int):
+    """
+    s[i] == '{' : parcourt les clés de l'objet sans décoder la valeur "events".
+    Renvoie l'offset du tableau "events", ou None si l'objet n'en a pas.
+    """
+    i = _skip_ws(s, i + 1)
+    while s[i:i + 1] == '"':
+        key, i = _decoder.raw_decode(s, i)
+        i = _skip_ws(s, i)
+        if s[i:i + 1] != ":":
+            return None
+        i = _skip_ws(s, i + 1)
+        if key == "events":
+            return i if s[i:i + 1] == "[" else None
+        _, i = _decoder.raw_decode(s, i)
+        i = _skip_ws(s, i)
+        if s[i:i + 1] == ",":
+            i = _skip_ws(s, i + 1)
+    return None
+
+
+def iter_raw_events(response_text: str):
+    """
+    Générateur des événements bruts (dicts JSON) d'une réponse partielle JSF.
+    Gère les deux formes vues côté OnBoard : '[{"events": [...]}]' et '[{event}, ...]'.
+    Un '{"events": []}' (fenêtre sans cours) ne produit aucun événement.
+    Lève ValueError si aucun tableau d'événements n'est trouvé.
+    """
+    pos = response_text.find("[{")
+    while pos != -1:
+        try:
+            events_at = _find_events_key(response_text, pos + 1)
+            if events_at is None:
+                first, _ = _decoder.raw_decode(response_text, pos + 1)
+                if not (isinstance(first, dict) and "start" in first):
+                    raise ValueError("pas un tableau d'événements")
+        except ValueError:
+            pos = response_text.find("[{", pos + 1)
+            continue
+
+        if events_at is not None:
+            yield from _iter_array(response_text, events_at)
+        else:
+            for ev in _iter_array(response_text, pos):
+                if not (isinstance(ev, dict) and "start" in ev):
+                    raise ValueError("Format JSON inattendu pour les événements.")
+                yield ev
+        return
+    if _EMPTY_EVENTS_RE.search(response_text):
+        return
+    raise ValueError("Impossible de trouver le JSON des événements dans la réponse.")
+
+
+def to_ics_date(dt_str: str) -> str:
+    # exemple: "2025-09-08T10:15:00+0200" -> heure locale Europe/Paris
+    m = _ISO_LOCAL_RE.match(dt_str)
+    if m:
+        # forme habituelle : simple réagencement, sans passer par strptime (lent)
+        return "".join(m.groups()[:3]) + "T" + "".join(m.groups()[3:])
+    dt = datetime.strptime(dt_str, "%Y-%m-%dT%H:%M:%S%z")
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def parse_title(title: str):
+    """
+    "PROD - C008 - ESLAMI - TD -" -> ("PROD", "C008", "ESLAMI", "TD").
+    La salle peut elle-même contenir " - " ; None si l'intitulé n'a pas cette forme.
+    """
+    parts = [p.strip() for p in title.rstrip(" -").split(" - ")]
+    if len(parts) < 4 or not all(parts):
+        return None
+    return parts[0], " - ".join(parts[1:-2]), parts[-2], parts[-1]
+
+
+class Event:
+    """
+    Événement normalisé compact. Les champs cours / salle / enseignant / type sont
+    internés (une seule copie par valeur, quel que soit le nombre d'événements) ;
+    l'intitulé brut n'est gardé que s'il diffère de sa forme canonique
+    "COURS - SALLE - ENSEIGNANT - TYPE -" (pas de tiret final, espacement irrégulier…),
+    ou s'il n'a pas cette forme (champs à None).
+    """
+
+    __slots__ = ("uid", "start", "end", "course", "room", "teacher", "kind", "raw")
+
+    def __init__(self, uid: str, start: str, end: str, course=None, room=None, teacher=None, kind=None, raw=None):
+        self.uid = uid
+        self.start = start
+        self.end = end
+        self.course = course
+        self.room = room
+        self.teacher = teacher
+        self.kind = kind
+        self.raw = raw
+
+    @classmethod
+    def from_title(cls, uid: str, start: str, end: str, title: str) -> "Event":
+        fields = parse_title(title)
+        if fields is None:
+            return cls(uid, start, end, raw=title)
+        course, room, teacher, kind = map(sys.intern, fields)
+        ev = cls(uid, start, end, course, room, teacher, kind)
+        if ev.title != title:
+            ev.raw = title
+        return ev
+
+    @property
+    def title(self) -> str:
+        """Intitulé d'origine, tel que renvoyé par OnBoard (stocké, filtré par regex)."""
+        if self.raw is not None:
+            return self.raw
+        return f"{self.course} - {self.room} - {self.teacher} - {self.kind} -"
+
+    @property
+    def summary(self) -> str:
+        if self.course is None:
+            return self.raw
+        return f"{self.course} - {self.kind}"
+
+    def __repr__(self):
+        return f"Event({self.uid!r}, {self.start!r}, {self.title!r})"
+
+
+def normalize_event(ev: dict) -> Event:
+    """Événement OnBoard brut -> Event (uid, début, fin, champs de l'intitulé)."""
+    # les créneaux reviennent d'un cours et d'un compte à l'autre : dates internées aussi
+    return Event.from_title(
+        (ev.get("id", "") or "") + "@onboard.ec-nantes.fr",
+        sys.intern(to_ics_date(ev["start"])),
+        sys.intern(to_ics_date(ev["end"])),
+        (ev.get("title", "") or "").strip().replace("\n", " ").replace("\r", " "),
+    )
+
+
+def iter_events(response_text: str):
+    """Générateur d'événements normalisés extraits de la réponse."""
+    for ev in iter_raw_events(response_text):
+        yield normalize_event(ev)
+
+
+def ics_text(value: str) -> str:
+    """Échappement des valeurs TEXT (RFC 5545 §3.3.11)."""
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def vevent_lines(ev: Event):
+    if ev.course is None:
+        return (
+            "BEGIN:VEVENT",
+            f"UID:{ev.uid}",
+            f"DTSTART;TZID=Europe/Paris:{ev.start}",
+            f"DTEND;TZID=Europe/Paris:{ev.end}",
+            f"SUMMARY:{ics_text(ev.raw)}",
+            "END:VEVENT",
+        )
+    return (
+        "BEGIN:VEVENT",
+        f"UID:{ev.uid}",
+        f"DTSTART;TZID=Europe/Paris:{ev.start}",
+        f"DTEND;TZID=Europe/Paris:{ev.end}",
+        f"SUMMARY:{ics_text(ev.summary)}",
+        f"LOCATION:{ics_text(ev.room)}",
+        f"CATEGORIES:{ics_text(ev.kind)}",
+        "DESCRIPTION:" + ics_text(f"Enseignant : {ev.teacher}\nSalle : {ev.room}"),
+        "END:VEVENT",
+    )
+
+
+def iter_ics_lines(events):
+    yield from ICS_HEADER
+    for ev in events:
+        yield from vevent_lines(ev)
+    yield from ICS_FOOTER
+
+
+def write_ics(events, fh) -> int:
+    """
+    Écrit le calendrier ligne à ligne dans fh (même sortie que "\\n".join des lignes)
+    et renvoie le nombre de VEVENT écrits.
+    """
+    count = 0
+    fh.write("\n".join(ICS_HEADER))
+    for ev in events:
+        fh.write("\n")
+        fh.write("\n".join(vevent_lines(ev)))
+        count += 1
+    fh.write("\n")
+    fh.write("\n".join(ICS_FOOTER))
+    return count
+
+
+class IcsChecker:
+    """
+    Validation structurelle légère d'un ICS, ligne par ligne : équilibre BEGIN/END,
+    propriétés obligatoires (VERSION/PRODID du VCALENDAR, UID/DTSTART des VEVENT)
+    et comptage des VEVENT. Remplace le parse complet icalendar pour le cas courant.
+    """
+
+    REQUIRED = {
+        "VCALENDAR": ("VERSION", "PRODID"),
+        "VEVENT": ("UID", "DTSTART"),
+    }
+
+    def __init__(self, allow_empty: bool = False):
+        self.stack = []     # [(nom du composant, propriétés vues)]
+        self.events = 0
+        self.lineno = 0
+        self.closed = False
+        # un flux filtré peut légitimement être vide (pas de DS cette semaine...)
+        self.allow_empty = allow_empty
+
+    def feed(self, line: str):
+        self.lineno += 1
+        line = line.rstrip("\r")
+        if not line or line[0] in " \t":
+            # ligne vide ou continuation (folding RFC 5545)
+            return
+        if self.closed:
+            raise ValueError(f"ICS ligne {self.lineno}: contenu après END:VCALENDAR")
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise ValueError(f"ICS ligne {self.lineno}: propriété sans ':' ({line[:40]!r})")
+        prop = name.split(";", 1)[0].upper()
+        if prop == "BEGIN":
+            comp = value.strip().upper()
+            if not self.stack and comp != "VCALENDAR":
+                raise ValueError(f"ICS ligne {self.lineno}: BEGIN:VCALENDAR attendu, trouvé BEGIN:{comp}")
+            self.stack.append((comp, set()))
+        elif prop == "END":
+            comp = value.strip().upper()
+            if not self.stack or self.stack[-1][0] != comp:
+                expected = self.stack[-1][0] if self.stack else "rien"
+                raise ValueError(f"ICS ligne {self.lineno}: END:{comp} alors que {expected} est ouvert")
+            _, seen = self.stack.pop()
+            missing = [p for p in self.REQUIRED.get(comp, ()) if p not in seen]
+            if missing:
+                raise ValueError(f"ICS ligne {self.lineno}: {comp} sans {', '.join(missing)}")
+            if comp == "VEVENT":
+                self.events += 1
+            if not self.stack:
+                self.closed = True
+        elif not self.stack:
+            raise ValueError(f"ICS ligne {self.lineno}: propriété {prop} hors VCALENDAR")
+        else:
+            self.stack[-1][1].add(prop)
+
+    def finish(self) -> int:
+        """Vérifie que le calendrier est complet (et non vide, sauf allow_empty) ; renvoie le nombre de VEVENT."""
+        if self.stack:
+            raise ValueError(f"ICS incomplet : {self.stack[-1][0]} jamais fermé")
+        if not self.closed:
+            raise ValueError("ICS vide")
+        if not self.events and not self.allow_empty:
+            raise ValueError("ICS ne contient aucun VEVENT -> rejeté")
+        return self.events
+
+
+class CheckingWriter:
+    """Enveloppe un fichier texte : tout ce qui est écrit passe ligne à ligne par un IcsChecker."""
+
+    def __init__(self, fh, checker: IcsChecker):
+        self.fh = fh
+        self.checker = checker
+        self.pending = ""
+
+    def write(self, chunk: str):
+        self.fh.write(chunk)
+        lines = (self.pending + chunk).split("\n")
+        self.pending = lines.pop()
+        for line in lines:
+            self.checker.feed(line)
+        return len(chunk)
+
+    def close(self) -> int:
+        if self.pending:
+            self.checker.feed(self.pending)
+            self.pending = ""
+        return self.checker.finish()
@@ -0,0 +1,144 @@
+# jsf_ids.py — résolution des ids de composants JSF (j_idtNN) d'OnBoard.
+# Les payloads sont écrits avec les ids relevés dans le navigateur ("ids modèles") ;
+# le résolveur découvre une fois les vrais ids sur les pages Login / MainMenuPage /
+# Planning et réécrit les payloads en une passe, au lieu de deviner après coup.
+
+import re
+import json
+import hashlib
+import threading
+from typing import Optional
+
+from atomicfile import write_atomic
+
+# id modèle (tel qu'écrit dans les payloads) -> rôle du composant
+TEMPLATE_IDS = {
+    "j_idt27": "login_submit",
+    "form:j_idt52": "submenu",
+    "form:j_idt815": "menu_select",
+    "form:j_idt856": "reflow_grid",
+    "j_idt858": "reflow_col",
+    "form:j_idt118": "schedule",
+}
+
+# rôles recherchés sur chaque page : (rôle, regex dont le groupe 1 est le vrai id)
+ROLE_PATTERNS = {
+    "login": [
+        ("login_submit", re.compile(r'<(?:button|input)\b[^>]*\bname="(j_idt\d+)"')),
+    ],
+    "main": [
+        ("submenu", re.compile(r'PrimeFaces\.ab\(\{s:"(form:j_idt\d+)"[^}]*?u:"form:sidebar"')),
+        ("menu_select", re.compile(r'name="(form:j_idt\d+)_input"')),
+        ("reflow_grid", re.compile(r'name="(form:j_idt\d+):j_idt\d+_reflowDD"')),
+        ("reflow_col", re.compile(r'name="form:j_idt\d+:(j_idt\d+)_reflowDD"')),
+    ],
+    "planning": [
+        ("schedule", re.compile(r'PrimeFaces\.cw\("Schedule".*?id\s*:\s*"(form:j_idt\d+)"')),
+    ],
+}
+
+_ID_ATTR_RE = re.compile(r'\bid="([^"]+)"')
+_TOKEN_RE = re.compile(r'(?:form:)?j_idt\d+')
+
+
+def page_fingerprint(page: str, text: str) -> str:
+    """Empreinte de la structure d'une page : suite des attributs id dans l'ordre du document."""
+    h = hashlib.sha1(page.encode("utf-8"))
+    for m in _ID_ATTR_RE.finditer(text):
+        h.update(b"\0")
+        h.update(m.group(1).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ComponentIdResolver:
+    """
+    Rôles -> vrais ids pour une session. Les découvertes sont mises en cache par empreinte
+    de page, en mémoire (partagé entre comptes du même process) et, si cache_file est
+    donné, sur disque d'un run à l'autre.
+    """
+
+    _shared = {}                # empreinte -> {rôle: id}
+    _lock = threading.Lock()
+
+    def __init__(self, cache_file: Optional[str] = None):
+        self.cache_file = cache_file
+        self.roles = {}
+        self.mapping = {}       # id modèle -> vrai id (seulement ceux qui diffèrent)
+        if cache_file:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for fp, roles in data.items():
+                self._shared.setdefault(fp, roles)
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            data = dict(self._shared)
+        try:
+            # tmp unique : plusieurs comptes peuvent apprendre la même page en même temps
+            write_atomic(self.cache_file, json.dumps(data, sort_keys=True), dir_mode=0o700)
+        except OSError as e:
+            print(f"[WARN] cache des ids JSF non écrit ({self.cache_file}): {e}")
+
+    def learn(self, page: str, text: str) -> dict:
+        """Découvre (ou relit du cache) les ids de la page ; renvoie les rôles trouvés."""
+        fp = page_fingerprint(page, text)
+        with self._lock:
+            found = self._shared.get(fp)
+        if found is None:
+            found = {}
+            for role, rx in ROLE_PATTERNS.get(page, ()):
+                m = rx.search(text)
+                if m:
+                    found[role] = m.group(1)
+            with self._lock:
+                self._shared[fp] = found
+            self._save()
+        self.roles.update(found)
+        self.mapping = {
+            tpl: self.roles[role]
+            for tpl, role in TEMPLATE_IDS.items()
+            if role in self.roles and self.roles[role] != tpl
+        }
+        return found
+
+    def set(self, role: str, real_id: str):
+        """Corrige un rôle à partir d'une réponse serveur (ex: id du schedule renvoyé en AJAX)."""
+        if self.roles.get(role) == real_id:
+            return
+        self.roles[role] = real_id
+        for tpl, r in TEMPLATE_IDS.items():
+            if r == role:
+                if real_id != tpl:
+                    self.mapping[tpl] = real_id
+                else:
+                    self.mapping.pop(tpl, None)
+
+    @property
+    def resolved(self) -> bool:
+        """Vrai dès qu'un composant de navigation (MainMenuPage / Planning) a été découvert."""
+        return any(role != "login_submit" for role in self.roles)
+
+    def rewrite(self, payload: dict) -> dict:
+        """Remplace en une passe les ids modèles par les vrais ids, dans les clés et les valeurs."""
+        if not self.mapping:
+            return payload
+        sub = lambda m: self.mapping.get(m.group(0), m.group(0))
+        rewritten = {}
+        for k, v in payload.items():
+            if "j_idt" in k:
+                k = _TOKEN_RE.sub(sub, k)
+            if isinstance(v, str) and "j_idt" in v:
+                v = _TOKEN_RE.sub(sub, v)
+            rewritten[k] = v
+        payload.clear()
+        payload.update(rewritten)
+        return payload
@@ -0,0 +1,128 @@
+# jsf_parser.py — analyse en une seule passe des réponses JSF/PrimeFaces
+# (partial-response XML des requêtes AJAX ou page HTML complète).
+
+import io
+import re
+import html
+from dataclasses import dataclass, field
+from typing import Optional
+
+VIEWSTATE_NAME = "javax.faces.ViewState"
+
+_INPUT_RE = re.compile(r'<input\b([^>]*)>', re.IGNORECASE)
+_FORM_RE = re.compile(r'<form\b([^>]*)>', re.IGNORECASE)
+_ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_JS_ID_RE = re.compile(r'id\s*:\s*"([^"]+)"')
+_JIDT_RE = re.compile(r'form:j_idt\d+')
+_SCHEDULE_CW_RE = re.compile(r'PrimeFaces\.cw\("Schedule".*?id\s*:\s*"([^"]+)"')
+_UPDATE_ID_RE = re.compile(r'<update id="(form:j_idt\d+)"')
+_LEADING_WS_RE = re.compile(r'\s*')
+
+
+@dataclass
+class JsfResponse:
+    """Résultat structuré d'une réponse JSF, rempli en un seul parcours."""
+    partial: bool = False
+    viewstate: Optional[str] = None
+    schedule_id: Optional[str] = None
+    hidden: dict = field(default_factory=dict)    # inputs type=hidden : name (ou id) -> value
+    inputs: dict = field(default_factory=dict)    # tous les inputs nommés, première occurrence
+    forms: dict = field(default_factory=dict)     # id du <form> -> action
+    updates: list = field(default_factory=list)   # [(update id, texte)] d'une partial-response
+
+    def input_value(self, name: str, default=None):
+        return self.inputs.get(name, default)
+
+
+def _attrs(tag_body: str) -> dict:
+    out = {}
+    for m in _ATTR_RE.finditer(tag_body):
+        value = m.group(2) if m.group(2) is not None else m.group(3)
+        out.setdefault(m.group(1).lower(), html.unescape(value))
+    return out
+
+
+def _scan_markup(text: str, res: JsfResponse):
+    """Un passage regex sur les <input>/<form> d'un fragment HTML, accumulé dans res."""
+    for m in _INPUT_RE.finditer(text):
+        a = _attrs(m.group(1))
+        name = a.get("name") or a.get("id")
+        if not name:
+            continue
+        value = a.get("value", "")
+        res.inputs.setdefault(name, value)
+        if a.get("type", "").lower() == "hidden":
+            res.hidden[name] = value
+        if name == VIEWSTATE_NAME and value and res.viewstate is None:
+            res.viewstate = value
+    for m in _FORM_RE.finditer(text):
+        a = _attrs(m.group(1))
+        if a.get("id") and "action" in a:
+            res.forms.setdefault(a["id"], a["action"])
+
+
+def _parse_partial(text: str, res: JsfResponse, start: int = 0) -> bool:
+    """Remplit res depuis une partial-response ; False si le XML est invalide."""
+    # importé ici : les pages HTML (et l'import du module) n'en ont pas besoin
+    import xml.etree.ElementTree as ET
+    # le prologue XML doit être en tête : les blancs éventuels avant lui sont sautés
+    if start:
+        text = text[start:]
+    # iterparse : chaque <update> est traité puis libéré, l'arbre complet n'est jamais gardé
+    try:
+        for _, elem in ET.iterparse(io.BytesIO(text.encode("utf-8")), events=("end",)):
+            _read_update(elem, res)
+    except ET.ParseError:
+        return False
+    return True
+
+
+def _read_update(elem, res: JsfResponse):
+    if elem.tag != "update":
+        return
+    upd_id = elem.get("id") or ""
+    upd_text = elem.text or ""
+    res.updates.append((upd_id, upd_text))
+    if "ViewState" in upd_id:
+        res.viewstate = upd_text.strip()
+    else:
+        m = _JS_ID_RE.search(upd_text)
+        if m and _JIDT_RE.match(m.group(1)):
+            res.schedule_id = m.group(1)
+        if not res.schedule_id:
+            m2 = _JIDT_RE.search(upd_id)
+            if m2:
+                res.schedule_id = m2.group(0)
+        _scan_markup(upd_text, res)
+    elem.clear()
+
+
+def _parse_html(text: str, res: JsfResponse):
+    _scan_markup(text, res)
+    m = _SCHEDULE_CW_RE.search(text)
+    if m:
+        res.schedule_id = m.group(1)
+    else:
+        m2 = _UPDATE_ID_RE.search(text)
+        if m2:
+            res.schedule_id = m2.group(1)
+
+
+def parse_jsf_response(text: str) -> JsfResponse:
+    """
+    Analyse une réponse OnBoard une seule fois et renvoie ViewState, inputs cachés,
+    id du composant schedule et fragments <update>. Une partial-response XML est lue en
+    streaming ; tout le reste (page XHTML avec prologue <?xml, XML invalide, ou XML sans
+    aucun <update>) est traité comme une page HTML.
+    """
+    # on découpe avant lstrip : pas de copie de toute la réponse à chaque appel
+    start = _LEADING_WS_RE.match(text, 0, 512).end()
+    head = text[start:start + 512]
+    # c'est l'élément racine qui décide : une page Facelets peut elle aussi commencer par <?xml
+    if "<partial-response" in head:
+        res = JsfResponse(partial=True)
+        if _parse_partial(text, res, start) and res.updates:
+            return res
+    res = JsfResponse()
+    _parse_html(text, res)
+    return res
@@ -0,0 +1,148 @@
+# metrics.py — mesures par étape d'un run (latence, tailles, ViewState, nouveaux essais,
+# nombre d'événements) exportées en rapport JSON et en fichier textfile Prometheus
+# (node_exporter --collector.textfile.directory).
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from atomicfile import write_atomic
+
+
+class RunMetrics:
+    """Mesures d'un compte pour un run. Chaque appel HTTP / écriture ajoute un enregistrement."""
+
+    def __init__(self, account: str):
+        self.account = account
+        self.started = time.time()
+        self.records = []
+        self.lock = threading.Lock()
+        self.success = None
+        self.changed = None
+        self.duration_s = None
+        self.wait_s = None
+        self.error = None
+
+    @contextmanager
+    def phase(self, name: str, kind: str, detail: Optional[str] = None):
+        """Chronomètre un bloc ; le dict renvoyé peut être complété (tailles, événements...)."""
+        rec = {"phase": name, "kind": kind, "status": None, "response_bytes": None, "wire_bytes": None,
+               "viewstate_bytes": None, "retries": 0, "events": None}
+        if detail:
+            rec["detail"] = detail
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        except Exception as e:
+            rec["error"] = str(e)
+            raise
+        finally:
+            rec["latency_s"] = round(time.perf_counter() - t0, 6)
+            with self.lock:
+                self.records.append(rec)
+
+    def finish(self, success: bool, duration_s: float, wait_s: float, changed=None, error=None):
+        self.success = success
+        self.duration_s = round(duration_s, 6)
+        self.wait_s = round(wait_s, 6)
+        self.changed = changed
+        self.error = error
+
+    def totals(self) -> dict:
+        """Agrège les enregistrements par nom d'étape (ex: toutes les fenêtres du mode plage)."""
+        out = {}
+        for rec in self.records:
+            t = out.setdefault(rec["phase"], {"calls": 0, "latency_s": 0.0, "response_bytes": 0, "wire_bytes": 0,
+                                              "viewstate_bytes": 0, "retries": 0, "events": 0})
+            t["calls"] += 1
+            t["latency_s"] += rec["latency_s"]
+            t["response_bytes"] += rec["response_bytes"] or 0
+            t["wire_bytes"] += rec.get("wire_bytes") or rec["response_bytes"] or 0
+            t["viewstate_bytes"] = max(t["viewstate_bytes"], rec["viewstate_bytes"] or 0)
+            t["retries"] += rec["retries"]
+            t["events"] += rec["events"] or 0
+        for t in out.values():
+            t["latency_s"] = round(t["latency_s"], 6)
+        return out
+
+    def transfer(self) -> tuple:
+        """(octets reçus sur le réseau, octets après décompression) sur tout le run."""
+        totals = self.totals().values()
+        return sum(t["wire_bytes"] for t in totals), sum(t["response_bytes"] for t in totals)
+
+    def summary(self) -> str:
+        """Une ligne par étape, la plus lente en premier."""
+        rows = sorted(self.totals().items(), key=lambda kv: -kv[1]["latency_s"])
+        return "\n".join(
+            f"  {name:<22} {t['latency_s']:>8.3f} s  x{t['calls']:<3} {t['response_bytes']:>9} o"
+            + (f"  {t['retries']} essais en plus" if t["retries"] else "")
+            for name, t in rows
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "account": self.account,
+            "started": self.started,
+            "success": self.success,
+            "changed": self.changed,
+            "duration_s": self.duration_s,
+            "wait_s": self.wait_s,
+            "error": self.error,
+            "phases": self.records,
+        }
+
+
+def write_json_report(path: str, runs: list):
+    write_atomic(path, json.dumps({"generated": time.time(), "runs": [m.to_dict() for m in runs]},
+                                   indent=2, ensure_ascii=False))
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text(runs: list) -> str:
+    series = {
+        "onboard_phase_duration_seconds": ("gauge", "Temps passé dans l'étape (somme des appels)", "latency_s"),
+        "onboard_phase_calls": ("gauge", "Nombre d'appels de l'étape", "calls"),
+        "onboard_phase_response_bytes": ("gauge", "Octets reçus pour l'étape (après décompression)", "response_bytes"),
+        "onboard_phase_wire_bytes": ("gauge", "Octets reçus sur le réseau pour l'étape (compressés)", "wire_bytes"),
+        "onboard_phase_viewstate_bytes": ("gauge", "Taille max du ViewState reçu", "viewstate_bytes"),
+        "onboard_phase_retries": ("gauge", "Nouveaux essais dans l'étape", "retries"),
+        "onboard_phase_events": ("gauge", "Événements extraits ou écrits dans l'étape", "events"),
+    }
+    lines = []
+    for metric, (mtype, help_text, key) in series.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {mtype}")
+        for m in runs:
+            for phase, t in m.totals().items():
+                lines.append(f'{metric}{{account="{_label(m.account)}",phase="{_label(phase)}"}} {t[key]}')
+    run_series = {
+        "onboard_run_duration_seconds": ("Durée totale du run", lambda m: m.duration_s),
+        "onboard_run_wait_seconds": ("Temps passé à attendre (limiteur, pauses)", lambda m: m.wait_s),
+        "onboard_run_success": ("1 si le run a réussi", lambda m: int(bool(m.success))),
+        "onboard_run_changed": ("1 si le planning a été réécrit", lambda m: int(bool(m.changed))),
+        "onboard_run_timestamp_seconds": ("Début du run (epoch)", lambda m: m.started),
+    }
+    for metric, (help_text, fn) in run_series.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for m in runs:
+            value = fn(m)
+            if value is not None:
+                lines.append(f'{metric}{{account="{_label(m.account)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, runs: list):
+    # écriture atomique : le collector textfile ne doit jamais lire un fichier à moitié écrit
+    write_atomic(path, prometheus_text(runs))
+
+
+def export(metrics_dir: str, runs: list):
+    write_json_report(os.path.join(metrics_dir, "run_report.json"), runs)
+    write_prometheus(os.path.join(metrics_dir, "onboard.prom"), runs)
@@ -0,0 +1,163 @@
+# publish.py — artefacts de publication des flux ICS dans un dossier dédié (déployé tel quel) :
+# copie stable <nom>.ics, versions précompressées .ics.gz (et .ics.br si brotli est installé),
+# copie immuable nommée par le hash du contenu, et manifest.json (hash, tailles, nombre
+# d'événements, date de génération) que les clients peuvent sonder à la place du flux complet.
+# Un artefact inchangé n'est pas réécrit : son mtime est conservé.
+
+import os
+import re
+import gzip
+import json
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from atomicfile import write_atomic
+
+MANIFEST = "manifest.json"
+# copies immuables gardées par flux (la courante + les précédentes, pour les clients en retard)
+KEEP_IMMUTABLE = 3
+HASH_LEN = 16
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        try:
+            import brotlicffi
+            return brotlicffi
+        except ImportError:
+            return None
+
+
+def write_if_different(path: str, data: bytes) -> bool:
+    """Remplace path atomiquement si son contenu diffère ; renvoie True si le fichier a été écrit."""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    write_atomic(path, data)
+    return True
+
+
+def immutable_name(name: str, sha: str) -> str:
+    """planning.ics + sha -> planning.<16 premiers hex>.ics"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{sha[:HASH_LEN]}{ext}"
+
+
+def prune_immutable(out_dir: str, name: str, history: list) -> list:
+    """
+    Supprime les copies immuables de `name` absentes de `history` (les plus récentes, tenues
+    dans le manifest : les mtimes ne survivent pas à une restauration depuis git) ;
+    renvoie les chemins supprimés.
+    """
+    stem, ext = os.path.splitext(name)
+    pattern = re.compile(re.escape(stem) + r"\.[0-9a-f]{%d}" % HASH_LEN + re.escape(ext) + r"\Z")
+    removed = [os.path.join(out_dir, f) for f in os.listdir(out_dir) if pattern.match(f) and f not in history]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def feed_files(name: str, entry: dict) -> list:
+    """Fichiers publiés pour un flux du manifest : stable, précompressés, copies immuables."""
+    files = [name, name + ".gz", name + ".br"]
+    history = entry.get("history") or [entry.get("immutable")]
+    return files + [f for f in history if f]
+
+
+def manifest_files(manifest: dict) -> list:
+    """Tous les fichiers listés par un manifest (lui compris) : ce qu'il faut restaurer avant un run."""
+    files = [MANIFEST]
+    for name, entry in (manifest.get("feeds") or {}).items():
+        files += feed_files(name, entry)
+    return files
+
+
+def publish_feed(path: str, out_dir: str, previous: Optional[dict] = None, now: Optional[str] = None) -> dict:
+    """Publie un fichier ICS dans out_dir ; renvoie son entrée de manifest."""
+    name = os.path.basename(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    sha = hashlib.sha256(data).hexdigest()
+    unchanged = previous is not None and previous.get("sha256") == sha
+    entry = {
+        "sha256": sha,
+        "size": len(data),
+        "events": data.count(b"BEGIN:VEVENT"),
+        "generated_at": previous["generated_at"] if unchanged else now,
+        "immutable": immutable_name(name, sha),
+    }
+    # copies immuables encore servies, de la plus récente à la plus ancienne
+    past = (previous or {}).get("history") or [(previous or {}).get("immutable")]
+    older = [f for f in past if f and f != entry["immutable"]]
+    entry["history"] = [entry["immutable"]] + older[:KEEP_IMMUTABLE - 1]
+    written = write_if_different(os.path.join(out_dir, name), data)
+    # copie immuable : le nom change avec le contenu, jamais réécrite
+    immutable = os.path.join(out_dir, entry["immutable"])
+    if not os.path.exists(immutable):
+        write_if_different(immutable, data)
+        written = True
+    # mtime=0 : même contenu -> mêmes octets compressés, donc pas de réécriture
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    written |= write_if_different(os.path.join(out_dir, name + ".gz"), gz)
+    entry["gzip_size"] = len(gz)
+    brotli = _brotli()
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        written |= write_if_different(os.path.join(out_dir, name + ".br"), br)
+        entry["br_size"] = len(br)
+    prune_immutable(out_dir, name, entry["history"])
+    entry["written"] = written
+    return entry
+
+
+def publish(paths: list, out_dir: str) -> bool:
+    """
+    Publie les ICS `paths` (ceux absents sont ignorés) et met à jour le manifest.
+    Renvoie True si au moins un artefact a été écrit.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    names = [os.path.basename(p) for p in paths]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Plusieurs flux ont le même nom de fichier : {names}")
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("feeds", {})
+    except (OSError, ValueError, AttributeError):
+        previous = {}
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    feeds, changed = {}, False
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        name = os.path.basename(path)
+        entry = publish_feed(path, out_dir, previous.get(name), now)
+        changed |= entry.pop("written")
+        feeds[name] = entry
+        print(f"publié : {name} ({entry['size']} o, gzip {entry['gzip_size']} o, {entry['events']} événements)"
+              + ("" if entry["generated_at"] == now else " inchangé"))
+    # flux retirés de la configuration : leurs artefacts ne doivent plus être déployés
+    for name, entry in previous.items():
+        if name in names or not isinstance(entry, dict):
+            continue
+        for f in feed_files(name, entry):
+            try:
+                os.remove(os.path.join(out_dir, f))
+                changed = True
+            except OSError:
+                pass
+        print(f"retiré : {name}")
+    manifest = {
+        "generated_at": max((e["generated_at"] for e in feeds.values()), default=now),
+        "feeds": feeds,
+    }
+    body = json.dumps(manifest, ensure_ascii=False, sort_keys=True, indent=1).encode("utf-8") + b"\n"
+    changed |= write_if_different(manifest_path, body)
+    return changed
@@ -0,0 +1,115 @@
+# runlock.py — fichier de verrou d'un run : deux exécutions qui se chevauchent (cron, run
+# manuel) n'écrivent pas les mêmes fichiers en même temps. Un verrou laissé par un process
+# mort est repris ; l'âge (stale_after) ne sert que si on ne peut pas savoir si son process
+# vit encore (autre machine, Windows) : un process vivant ne perd jamais son verrou.
+
+import os
+import json
+import time
+import socket
+from typing import Optional
+
+
+class LockHeld(RuntimeError):
+    """Un autre run, toujours actif, détient le verrou."""
+
+
+def pid_alive(pid: int) -> Optional[bool]:
+    """True / False si on peut le savoir, None sinon (Windows)."""
+    if os.name == "nt":
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return None
+    return True
+
+
+class RunLock:
+    def __init__(self, path: str, stale_after: Optional[float] = None):
+        self.path = path
+        self.stale_after = stale_after
+        self.token = None
+
+    def read(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def stale_reason(self, holder: Optional[dict]) -> Optional[str]:
+        """Pourquoi le verrou peut être repris, ou None s'il est toujours valide."""
+        if holder is None:
+            return "verrou illisible"
+        if holder.get("host") == socket.gethostname():
+            alive = pid_alive(int(holder.get("pid", 0)))
+            if alive is False:
+                return f"process {holder.get('pid')} terminé"
+            if alive:
+                # même un run qui dépasse son échéance garde la main : pas de chevauchement
+                return None
+        age = time.time() - float(holder.get("started", 0))
+        if self.stale_after is not None and age > self.stale_after:
+            return f"verrou vieux de {age:.0f} s (> {self.stale_after:.0f} s)"
+        return None
+
+    def acquire(self):
+        token = {"pid": os.getpid(), "host": socket.gethostname(), "started": time.time()}
+        for _ in range(3):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                holder = self.read()
+                reason = self.stale_reason(holder)
+                if reason is None:
+                    raise LockHeld(f"run déjà en cours (pid {holder.get('pid')} sur {holder.get('host')}, "
+                                   f"depuis {time.time() - float(holder.get('started', 0)):.0f} s) : {self.path}")
+                self.take_over(holder, reason)
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(token, f)
+            self.token = token
+            return self
+        raise LockHeld(f"verrou disputé, abandon : {self.path}")
+
+    def take_over(self, holder: Optional[dict], reason: str):
+        """Écarte le verrou périmé ; si un autre process l'a remplacé entre-temps, on le remet."""
+        aside = f"{self.path}.stale.{os.getpid()}"
+        try:
+            os.rename(self.path, aside)
+        except FileNotFoundError:
+            return
+        try:
+            with open(aside, "r", encoding="utf-8") as f:
+                moved = json.load(f)
+        except (OSError, ValueError):
+            moved = None
+        if moved != holder:
+            # verrou frais d'un concurrent : le remettre (sauf si la place a déjà été reprise)
+            try:
+                os.link(aside, self.path)
+            except OSError:
+                pass
+        else:
+            print(f"verrou {self.path} repris : {reason}")
+        os.remove(aside)
+
+    def release(self):
+        if self.token is not None and self.read() == self.token:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self.token = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,81 @@
+# Tests de deadline.Deadline avec une horloge simulée.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from deadline import Deadline, DeadlineExceeded, PHASES
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_no_limit():
+    d = Deadline(clock=Clock())
+    with d.phase("login"):
+        assert d.remaining() == float("inf")
+        assert d.timeout((5.0, 30.0)) == (5.0, 30.0)
+
+
+def test_not_after_bounds_total():
+    clock = Clock()
+    d = Deadline(100, not_after=1040.0, clock=clock)
+    assert d.remaining() == pytest.approx(40.0)
+
+
+def test_phase_shares_and_unused_time_carries_over():
+    clock = Clock()
+    d = Deadline(100, clock=clock)
+    with d.phase("login"):
+        assert d.remaining() == pytest.approx(25.0)
+        clock.now += 5
+    # 95 s restent pour navigation, download, write (0.25 / 0.75 de ce reste)
+    with d.phase("navigation"):
+        assert d.remaining() == pytest.approx(95 / 3)
+    assert d.remaining() == pytest.approx(95.0)
+
+
+def test_nested_phase_is_bounded_by_enclosing_phase():
+    clock = Clock()
+    d = Deadline(100, clock=clock)
+    with d.phase("download"):
+        # download seule restante avant write : 0.4 / 0.5 du run
+        assert d.remaining() == pytest.approx(80.0)
+        clock.now += 70
+        with d.phase("write"):
+            # write pèserait tout le reste du run (30 s) : bornée aux 10 s de download
+            assert d.remaining() == pytest.approx(10.0)
+        assert d.phase_name == "download"
+
+
+def test_timeout_is_shortened_then_raises():
+    clock = Clock()
+    d = Deadline(10, shares=PHASES, clock=clock)
+    assert d.timeout((5.0, 30.0)) == (5.0, 10.0)
+    clock.now += 10
+    with pytest.raises(DeadlineExceeded):
+        d.timeout((5.0, 30.0))
+
+
+def test_phase_entered_after_budget_raises():
+    clock = Clock()
+    d = Deadline(10, clock=clock)
+    clock.now += 11
+    with pytest.raises(DeadlineExceeded, match="phase login"):
+        with d.phase("login"):
+            pass
+
+
+def test_sleep_longer_than_budget_raises_without_waiting():
+    d = Deadline(1, clock=Clock())
+    with pytest.raises(DeadlineExceeded):
+        d.sleep(5)
@@ -0,0 +1,140 @@
+# Tests de event_store (synchronisation des fenêtres, fraîcheur) et du découpage en fenêtres
+# de get_ics (split_windows / window_params, changements d'heure compris).
+
+import os
+import sys
+from datetime import date, datetime, timezone
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from event_store import EventStore, PAST_MAX_AGE, max_age
+from get_ics import split_windows, window_params
+from ics_stream import Event
+
+TODAY = date(2025, 9, 15)
+NOW = 1_757_900_000.0
+WEEK = (date(2025, 9, 15), date(2025, 9, 22))
+
+
+def ev(uid: str, start: str, title: str = "PROD - C008 - ESLAMI - TD -") -> Event:
+    return Event.from_title(uid + "@onboard.ec-nantes.fr", start, start[:9] + "235900", title)
+
+
+@pytest.fixture
+def store():
+    s = EventStore(":memory:")
+    yield s
+    s.close()
+
+
+def uids(events) -> list:
+    return [e.uid.split("@")[0] for e in events]
+
+
+def test_sync_counts_added_unchanged_changed(store):
+    a, b = WEEK
+    assert store.sync_window(a, b, [ev("1", "20250915T080000"), ev("2", "20250916T080000")], now=NOW) == (2, 0, 0)
+    assert store.sync_window(a, b, [ev("1", "20250915T080000"), ev("2", "20250916T080000")], now=NOW + 1) == (0, 0, 0)
+    h = store.history("1@onboard.ec-nantes.fr")
+    assert (h["first_seen"], h["last_seen"], h["last_changed"]) == (NOW, NOW + 1, NOW)
+    moved = [ev("1", "20250915T100000"), ev("2", "20250916T080000")]
+    assert store.sync_window(a, b, moved, now=NOW + 2) == (0, 1, 0)
+    assert store.history("1@onboard.ec-nantes.fr")["last_changed"] == NOW + 2
+
+
+def test_missing_events_are_marked_deleted_then_revived(store):
+    a, b = WEEK
+    store.sync_window(a, b, [ev("1", "20250915T080000"), ev("2", "20250916T080000")], now=NOW)
+    assert store.sync_window(a, b, [ev("1", "20250915T080000")], now=NOW + 1) == (0, 0, 1)
+    assert store.history("2@onboard.ec-nantes.fr")["deleted_at"] == NOW + 1
+    assert uids(store.iter_range(a, b)) == ["1"]
+    # revenu à l'identique : compté comme modifié et réactivé
+    assert store.sync_window(a, b, [ev("1", "20250915T080000"), ev("2", "20250916T080000")], now=NOW + 2) == (0, 1, 0)
+    assert store.history("2@onboard.ec-nantes.fr")["deleted_at"] is None
+    assert uids(store.iter_range(a, b)) == ["1", "2"]
+
+
+def test_sync_only_deletes_inside_the_window(store):
+    store.sync_window(date(2025, 9, 8), date(2025, 9, 15), [ev("0", "20250914T235900")], now=NOW)
+    store.sync_window(*WEEK, [ev("1", "20250915T000000")], now=NOW)
+    store.sync_window(date(2025, 9, 22), date(2025, 9, 29), [ev("3", "20250922T000000")], now=NOW)
+    assert store.sync_window(*WEEK, [], now=NOW + 1) == (0, 0, 1)
+    assert uids(store.iter_range(date(2025, 9, 1), date(2025, 10, 1))) == ["0", "3"]
+
+
+def test_iter_range_bounds_and_order(store):
+    store.sync_window(date(2025, 9, 8), date(2025, 9, 29), [
+        ev("c", "20250922T000000"), ev("b", "20250915T080000"), ev("a", "20250915T080000"),
+        ev("z", "20250914T235959"),
+    ], now=NOW)
+    # début inclus, fin exclue, tri par début puis uid
+    assert uids(store.iter_range(*WEEK)) == ["a", "b"]
+    assert uids(store.iter_range(date(2025, 9, 14), date(2025, 9, 23))) == ["z", "a", "b", "c"]
+
+
+def test_max_age_tiers():
+    assert max_age(date(2025, 9, 1), date(2025, 9, 8), TODAY) == PAST_MAX_AGE
+    assert max_age(date(2025, 9, 15), date(2025, 9, 22), TODAY) == 0
+    assert max_age(date(2025, 9, 8), date(2025, 9, 16), TODAY) == 0
+    assert max_age(date(2025, 10, 13), date(2025, 10, 20), TODAY) == 6 * 3600
+    assert max_age(date(2025, 12, 1), date(2025, 12, 8), TODAY) == 24 * 3600
+    assert max_age(date(2026, 6, 1), date(2026, 6, 8), TODAY) == 3 * 24 * 3600
+
+
+def test_due_windows(store):
+    near, mid, past = WEEK, (date(2025, 10, 13), date(2025, 10, 20)), (date(2025, 9, 1), date(2025, 9, 8))
+    windows = [past, near, mid]
+    assert store.due_windows(windows, today=TODAY, now=NOW) == windows
+    for a, b in windows:
+        store.sync_window(a, b, [], now=NOW)
+    # la semaine en cours est toujours rafraîchie ; les autres attendent leur âge max
+    assert store.due_windows(windows, today=TODAY, now=NOW + 60) == [near]
+    assert store.due_windows(windows, today=TODAY, now=NOW + 6 * 3600) == [near, mid]
+    assert store.due_windows(windows, today=TODAY, now=NOW + PAST_MAX_AGE) == windows
+
+
+def test_split_windows():
+    assert split_windows(date(2025, 9, 17), date(2025, 9, 29)) == [
+        (date(2025, 9, 15), date(2025, 9, 22)),
+        (date(2025, 9, 22), date(2025, 9, 29)),
+        (date(2025, 9, 29), date(2025, 10, 6)),
+    ]
+    assert split_windows(date(2025, 12, 15), date(2026, 2, 1), "month") == [
+        (date(2025, 12, 1), date(2026, 1, 1)),
+        (date(2026, 1, 1), date(2026, 2, 1)),
+        (date(2026, 2, 1), date(2026, 3, 1)),
+    ]
+    with pytest.raises(ValueError):
+        split_windows(date(2025, 9, 2), date(2025, 9, 1))
+    with pytest.raises(ValueError):
+        split_windows(date(2025, 9, 1), date(2025, 9, 2), "day")
+
+
+def ms(*utc) -> str:
+    return str(int(datetime(*utc, tzinfo=timezone.utc).timestamp() * 1000))
+
+
+def test_window_params_across_dst_end():
+    # passage à l'heure d'hiver le 26/10/2025 : semaine de 7 j + 1 h, décalage +2 h au début
+    p = window_params(date(2025, 10, 20), date(2025, 10, 27))
+    assert p["start"] == ms(2025, 10, 19, 22)
+    assert p["end"] == ms(2025, 10, 26, 23)
+    assert p["offset"] == "-7200000"
+    assert (p["date_input"], p["week"]) == ("20/10/2025", "43-2025")
+    assert window_params(date(2025, 10, 27), date(2025, 11, 3))["offset"] == "-3600000"
+
+
+def test_window_params_across_dst_start():
+    # passage à l'heure d'été le 29/03/2026 : semaine de 7 j - 1 h
+    p = window_params(date(2026, 3, 23), date(2026, 3, 30))
+    assert p["start"] == ms(2026, 3, 22, 23)
+    assert p["end"] == ms(2026, 3, 29, 22)
+    assert p["offset"] == "-3600000"
+    assert window_params(date(2026, 3, 30), date(2026, 4, 6))["offset"] == "-7200000"
+
+
+def test_window_params_week_number_at_year_end():
+    assert window_params(date(2025, 12, 29), date(2026, 1, 5))["week"] == "1-2026"
@@ -0,0 +1,41 @@
+# Tests de ics_stream.Event : l'intitulé d'origine est toujours restitué tel quel.
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from ics_stream import Event, vevent_lines
+
+
+def event(title: str) -> Event:
+    return Event.from_title("1@onboard.ec-nantes.fr", "20250915T080000", "20250915T100000", title)
+
+
+def test_canonical_title_is_not_duplicated():
+    ev = event("PROD - C008 - ESLAMI - TD -")
+    assert ev.raw is None
+    assert ev.title == "PROD - C008 - ESLAMI - TD -"
+    assert (ev.course, ev.room, ev.teacher, ev.kind) == ("PROD", "C008", "ESLAMI", "TD")
+
+
+def test_irregular_titles_round_trip():
+    for title in ("PROD - C008 - ESLAMI - TD", "PROD  - C008 - ESLAMI - TD -", "PROD - A - B - ESLAMI - CM -"):
+        ev = event(title)
+        assert ev.title == title
+        assert ev.course == "PROD"
+
+
+def test_irregular_title_keeps_structured_ics():
+    ev = event("PROD - C008 - ESLAMI - TD")
+    lines = vevent_lines(ev)
+    assert "SUMMARY:PROD - TD" in lines
+    assert "LOCATION:C008" in lines
+
+
+def test_unstructured_title_is_kept_raw():
+    ev = event("Réunion de rentrée")
+    assert ev.course is None
+    assert ev.title == ev.summary == "Réunion de rentrée"
+    assert "SUMMARY:Réunion de rentrée" in vevent_lines(ev)
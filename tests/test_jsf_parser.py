@@ -0,0 +1,79 @@
+# Tests de jsf_parser.parse_jsf_response sur des réponses OnBoard enregistrées (tests/fixtures/jsf).
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from jsf_parser import VIEWSTATE_NAME, parse_jsf_response
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "jsf")
+
+
+def load(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_login_page():
+    res = parse_jsf_response(load("login.html"))
+    assert not res.partial
+    assert res.viewstate == "-5214879546318237419:2401582316087645371"
+    assert res.forms["formulaireSpring"] == "/faces/Login.xhtml;jsessionid=ABC123"
+    assert res.hidden["formulaireSpring"] == "formulaireSpring"
+    assert res.input_value("username") == ""
+    assert res.schedule_id is None
+
+
+def test_mainmenu_page():
+    res = parse_jsf_response(load("mainmenu.html"))
+    assert res.viewstate == "1111:2222"
+    assert res.hidden["form:largeurDivCenter"] == "907"
+    assert res.hidden["form:idInit"] == "webscolaapp.MainMenuPage_5977318950196537139"
+    assert res.input_value("form:j_idt824_input") == "45803"
+    assert res.forms["form"] == "/faces/MainMenuPage.xhtml"
+
+
+def test_planning_schedule_widget():
+    res = parse_jsf_response(load("planning_cw.html"))
+    assert res.schedule_id == "form:j_idt118"
+    assert res.viewstate == "3333:4444"
+    assert res.hidden["form:week"] == "38-2025"
+
+
+def test_partial_response_with_viewstate_update():
+    res = parse_jsf_response(load("partial_viewstate.xml"))
+    assert res.partial
+    assert res.viewstate == "5555:6666"
+    assert res.schedule_id == "form:j_idt118"
+    assert [upd_id for upd_id, _ in res.updates] == ["form:j_idt118", "j_id1:javax.faces.ViewState:0"]
+    assert '"events"' in res.updates[0][1]
+
+
+def test_malformed_partial_falls_back_to_html():
+    res = parse_jsf_response(load("partial_malformed.xml"))
+    assert not res.partial
+    assert res.viewstate == "7777:8888"
+    assert res.hidden[VIEWSTATE_NAME] == "7777:8888"
+
+
+def test_xhtml_page_with_xml_prolog_is_html():
+    res = parse_jsf_response(load("xhtml_prolog.html"))
+    assert not res.partial
+    assert res.viewstate == "123:456"
+    assert res.forms == {"formulaireSpring": "/faces/Login.xhtml"}
+
+
+def test_leading_whitespace_before_partial_response():
+    res = parse_jsf_response("\n\n  " + load("partial_viewstate.xml"))
+    assert res.partial
+    assert res.viewstate == "5555:6666"
+
+
+def test_import_does_not_load_elementtree():
+    # get_ics importe jsf_parser au démarrage : xml.etree ne doit être chargé qu'à la première partial-response
+    code = "import sys, get_ics; print('xml.etree.ElementTree' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,76 @@
+# Tests de runlock.RunLock : verrou libre, tenu par un process vivant, périmé, repris en concurrence.
+
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from runlock import LockHeld, RunLock
+
+
+def dead_pid() -> int:
+    p = subprocess.Popen([sys.executable, "-c", "pass"])
+    p.wait()
+    return p.pid
+
+
+def write_holder(path: str, **holder) -> dict:
+    data = {"pid": os.getpid(), "host": socket.gethostname(), "started": time.time()}
+    data.update(holder)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return data
+
+
+def test_acquire_and_release(tmp_path):
+    path = str(tmp_path / "run.lock")
+    with RunLock(path) as lock:
+        assert lock.read()["pid"] == os.getpid()
+    assert not os.path.exists(path)
+
+
+def test_live_holder_is_never_stolen_even_when_old(tmp_path):
+    path = str(tmp_path / "run.lock")
+    write_holder(path, started=time.time() - 3600)
+    with pytest.raises(LockHeld):
+        RunLock(path, stale_after=60).acquire()
+    assert os.path.exists(path)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="pid_alive inconnu sous Windows")
+def test_dead_holder_is_taken_over(tmp_path):
+    path = str(tmp_path / "run.lock")
+    write_holder(path, pid=dead_pid())
+    lock = RunLock(path).acquire()
+    assert lock.read() == lock.token
+    lock.release()
+
+
+def test_remote_holder_only_stale_after_age(tmp_path):
+    path = str(tmp_path / "run.lock")
+    write_holder(path, host="autre-machine", pid=1)
+    with pytest.raises(LockHeld):
+        RunLock(path, stale_after=60).acquire()
+    write_holder(path, host="autre-machine", pid=1, started=time.time() - 120)
+    lock = RunLock(path, stale_after=60).acquire()
+    assert lock.read()["host"] == socket.gethostname()
+    lock.release()
+
+
+def test_take_over_puts_back_a_fresh_lock_from_a_concurrent_run(tmp_path):
+    path = str(tmp_path / "run.lock")
+    stale = write_holder(path, host="autre-machine", pid=1, started=0)
+    lock = RunLock(path, stale_after=60)
+    assert lock.stale_reason(lock.read())
+    # entre la lecture et la reprise, un autre run a déjà remplacé le verrou périmé
+    fresh = write_holder(path, pid=12345, started=time.time())
+    lock.take_over(stale, "test")
+    assert lock.read() == fresh
+    assert os.listdir(tmp_path) == ["run.lock"]
@@ -0,0 +1,49 @@
+# Tests de transport : session sans nouvel essai urllib3 + retrying() sur un port fermé.
+
+import os
+import sys
+import socket
+
+import pytest
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from transport import make_session, retrying
+
+
+def closed_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def test_unreachable_server_is_retried_then_raises_requests_error():
+    session = make_session("test", 1, 0, 0.0, (1.0, 1.0))
+    url = f"http://127.0.0.1:{closed_port()}/"
+    logs, pauses = [], []
+    with pytest.raises(requests.ConnectionError):
+        retrying(lambda: session.get(url), 2, 0.0, logs.append, "GET x", sleep=pauses.append)
+    assert len(pauses) == 2
+    assert all("nouvel essai" in line for line in logs)
+
+
+def test_retrying_stops_on_success():
+    class R:
+        def __init__(self, code):
+            self.status_code = code
+
+    replies = iter([R(503), R(200)])
+    r, n = retrying(lambda: next(replies), 3, 0.0, sleep=lambda d: None)
+    assert (r.status_code, n) == (200, 1)
+
+
+def test_post_statuses_exclude_500():
+    class R:
+        status_code = 500
+
+    r, n = retrying(lambda: R(), 3, 0.0, sleep=lambda d: None, statuses=(429, 502, 503, 504))
+    assert n == 0
@@ -0,0 +1,116 @@
+# transport.py — couche HTTP de get_ics.py : pool de connexions dimensionné, négociation
+# de compression, timeouts par défaut, nouveaux essais avec backoff exponentiel + gigue
+# (par urllib3, ou par retrying() quand chaque essai doit respecter une échéance).
+
+import time
+import random
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# codes pour lesquels un nouvel essai a une chance d'aboutir (proxy / serveur momentanément KO)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# POST (même idempotent côté JSF) : un 500 peut venir d'un traitement déjà fait côté serveur,
+# on ne rejoue que les refus de proxy / surcharge
+POST_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def accept_encoding() -> str:
+    """gzip/deflate toujours ; brotli seulement si urllib3 sait le décoder (module installé)."""
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append("br")
+        except ImportError:
+            pass
+    return ", ".join(encodings)
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 10.0) -> float:
+    """Backoff exponentiel avec gigue « full jitter » : uniforme dans [0, base * 2^(essai-1)]."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter qui applique un timeout (connexion, lecture) quand la requête n'en donne pas."""
+
+    def __init__(self, *args, timeout=(5.0, 30.0), **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def make_retry(retries: int, backoff: float) -> Retry:
+    """
+    Politique urllib3 : seuls GET/HEAD sont rejoués automatiquement (idempotents).
+    retries=0 désactive tout nouvel essai côté urllib3 ; comme le défaut de requests
+    (Retry(0, read=False)), les erreurs restent enveloppées en requests.ConnectionError /
+    ConnectTimeout, que retrying() et les appelants savent rattraper.
+    """
+    if retries <= 0:
+        return Retry(0, read=False)
+    kwargs = dict(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset({"GET", "HEAD"}),
+                  respect_retry_after_header=True, raise_on_status=False)
+    try:
+        return Retry(backoff_jitter=backoff, **kwargs)
+    except TypeError:
+        # urllib3 < 2 : pas de gigue native
+        return Retry(**kwargs)
+
+
+def make_session(user_agent: str, pool_size: int = 10, retries: int = 3, backoff: float = 0.5,
+                 timeout=(5.0, 30.0)) -> requests.Session:
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                 max_retries=make_retry(retries, backoff), timeout=timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": user_agent, "Accept-Encoding": accept_encoding()})
+    return session
+
+
+def retrying(send, retries: int, backoff: float, log=None, context: str = "requête", sleep=time.sleep,
+             statuses=RETRY_STATUSES):
+    """
+    Rejoue send() (un GET, ou un POST sans effet de bord avec statuses=POST_RETRY_STATUSES)
+    sur erreur réseau ou code de statuses. Renvoie (réponse, nombre de nouveaux essais).
+    sleep peut borner les pauses (ex. Deadline.sleep, qui lève si le budget est dépassé).
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            r = send()
+            if r.status_code not in statuses or attempt > retries:
+                return r, attempt - 1
+            reason = f"HTTP {r.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt > retries:
+                raise
+            reason = type(e).__name__
+        delay = backoff_delay(attempt, backoff)
+        if log:
+            log(f"{context} : {reason}, nouvel essai {attempt}/{retries} dans {delay:.2f} s")
+        sleep(delay)
+
+
+def wire_bytes(r) -> Optional[int]:
+    """Octets réellement reçus (avant décompression) ; None si urllib3 ne le sait pas."""
+    raw = getattr(r, "raw", None)
+    try:
+        n = raw.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+    return n if n else None